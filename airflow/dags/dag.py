@@ -6,10 +6,18 @@ from airflow.utils.trigger_rule import TriggerRule
 
 from operators.care_providers import (
     clean_care_providers,
-    create_care_providers_datacube,
+    create_care_providers_shard,
+    merge_care_providers_datacube,
+    partition_care_providers,
+)
+from operators.download import DeferrableDownloadOperator
+from operators.general import cleanup, edit_enum
+from operators.population import (
+    clean_population,
+    create_population_shard,
+    merge_population_datacube,
+    partition_population,
 )
-from operators.general import cleanup, download_file, edit_enum
-from operators.population import clean_population, create_population_datacube
 
 with DAG(
     dag_id="data-cubes",
@@ -19,46 +27,31 @@ with DAG(
     catchup=False,
     description="DAG producing population and care providers data cubes",
 ) as dag:
-    d_enum = PythonOperator(
+    d_enum = DeferrableDownloadOperator(
         task_id="download_county_enum",
-        python_callable=download_file,
-        op_args=(
-            [
-                "https://skoda.projekty.ms.mff.cuni.cz/ndbi046/seminars/02/%C4%8D%C3%ADseln%C3%ADk-okres%C5%AF-vazba-101-nad%C5%99%C3%ADzen%C3%BD.csv",
-                "region_enum.csv",
-            ]
-        ),
+        url="https://skoda.projekty.ms.mff.cuni.cz/ndbi046/seminars/02/%C4%8D%C3%ADseln%C3%ADk-okres%C5%AF-vazba-101-nad%C5%99%C3%ADzen%C3%BD.csv",
+        name="region_enum.csv.gz",
     )
     d_enum.doc = "Downloads enum mapping LAU county codes to NUTS."
 
-    d_pop = PythonOperator(
+    d_pop = DeferrableDownloadOperator(
         task_id="download_population",
-        python_callable=download_file,
-        op_args=(
-            [
-                "https://www.czso.cz/documents/10180/184344914/130141-22data2021.csv",
-                "population2021.csv",
-            ]
-        ),
+        url="https://www.czso.cz/documents/10180/184344914/130141-22data2021.csv",
+        name="population2021.csv.gz",
     )
     d_pop.doc = "Downloads population 2021 dataset."
 
-    d_cp = PythonOperator(
+    d_cp = DeferrableDownloadOperator(
         task_id="download_providers",
-        python_callable=download_file,
-        op_args=(
-            [
-                "https://opendata.mzcr.cz/data/nrpzs/narodni-registr-poskytovatelu-zdravotnich-sluzeb.csv",
-                "care_providers.csv",
-            ]
-        ),
+        url="https://opendata.mzcr.cz/data/nrpzs/narodni-registr-poskytovatelu-zdravotnich-sluzeb.csv",
+        name="care_providers.csv.gz",
     )
-    d_cp.doc = "Downloads care providers dataset."
+    d_cp.doc = "Downloads care providers dataset in parallel byte ranges, resuming partial parts."
 
     clean_cp = PythonOperator(
         task_id="clean_providers",
         python_callable=clean_care_providers,
-        op_args=(["./tmp/care_providers.csv"]),
+        op_args=(["{{ ti.xcom_pull(task_ids='download_providers') }}"]),
     )
     clean_cp.doc = (
         "Cleans care providers dataset. Keeps only needed columns and complete values."
@@ -67,7 +60,7 @@ with DAG(
     clean_pop = PythonOperator(
         task_id="clean_population",
         python_callable=clean_population,
-        op_args=(["./tmp/population2021.csv"]),
+        op_args=(["{{ ti.xcom_pull(task_ids='download_population') }}"]),
     )
     clean_pop.doc = (
         "Cleans population dataset. Keeps only needed columns and complete values."
@@ -76,33 +69,70 @@ with DAG(
     edit_enum = PythonOperator(
         task_id="edit_enum",
         python_callable=edit_enum,
-        op_args=(["./tmp/region_enum.csv", "./tmp/care_providers.csv"]),
+        op_args=(
+            [
+                "{{ ti.xcom_pull(task_ids='download_county_enum') }}",
+                "{{ ti.xcom_pull(task_ids='clean_providers') }}",
+            ]
+        ),
     )
     edit_enum.doc = (
         "Cleans enum, adds region and country names from care providers dataset."
     )
 
-    create_pop = PythonOperator(
+    partition_pop = PythonOperator(
+        task_id="partition_population",
+        python_callable=partition_population,
+        op_args=(
+            [
+                "{{ ti.xcom_pull(task_ids='clean_population') }}",
+                "{{ ti.xcom_pull(task_ids='edit_enum') }}",
+            ]
+        ),
+    )
+    partition_pop.doc = "Lists regions, one population cube shard is created for each."
+
+    # one mapped task per region, a failed region is retried on its own
+    create_pop = PythonOperator.partial(
         task_id="create_population_cube",
-        python_callable=create_population_datacube,
-        op_args=(["./tmp/population2021.csv", "./tmp/region_enum.csv"]),
+        python_callable=create_population_shard,
+        doc="Creates population observations of one region.",
+    ).expand(op_kwargs=partition_pop.output)
+
+    merge_pop = PythonOperator(
+        task_id="merge_population_cube",
+        python_callable=merge_population_datacube,
+        op_args=(["{{ ti.xcom_pull(task_ids='edit_enum') }}", create_pop.output]),
     )
-    create_pop.doc = "Creates population datacube."
+    merge_pop.doc = "Joins region shards with the shared structure into population datacube."
 
-    create_cp = PythonOperator(
+    partition_cp = PythonOperator(
+        task_id="partition_providers",
+        python_callable=partition_care_providers,
+        op_args=(["{{ ti.xcom_pull(task_ids='clean_providers') }}"]),
+    )
+    partition_cp.doc = "Lists regions, one care providers cube shard is created for each."
+
+    create_cp = PythonOperator.partial(
         task_id="create_providers_cube",
-        python_callable=create_care_providers_datacube,
-        op_args=(["./tmp/care_providers.csv"]),
+        python_callable=create_care_providers_shard,
+        doc="Creates care providers observations of one region.",
+    ).expand(op_kwargs=partition_cp.output)
+
+    merge_cp = PythonOperator(
+        task_id="merge_providers_cube",
+        python_callable=merge_care_providers_datacube,
+        op_args=(["{{ ti.xcom_pull(task_ids='clean_providers') }}", create_cp.output]),
     )
-    create_cp.doc = "Creates care providers datacube."
+    merge_cp.doc = "Joins region shards with the shared structure into care providers datacube."
 
     clean = PythonOperator(
         task_id="cleanup", python_callable=cleanup, trigger_rule=TriggerRule.ALL_DONE
     )
-    clean.doc = "Cleanup of temporary files."
+    clean.doc = "Removes leftover downloads of the run and evicts least recently used artifacts."
 
     d_pop >> clean_pop
-    d_cp >> clean_cp >> create_cp
+    d_cp >> clean_cp >> partition_cp >> create_cp >> merge_cp
     [d_enum, clean_cp] >> edit_enum
-    [clean_pop, edit_enum] >> create_pop
-    [create_cp, create_pop] >> clean
+    [clean_pop, edit_enum] >> partition_pop >> create_pop >> merge_pop
+    [merge_cp, merge_pop] >> clean
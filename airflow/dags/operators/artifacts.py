@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+import uuid
+from typing import Callable
+
+# shared by all runs, every file in it is immutable and named by its key
+ARTIFACTS_PATH = os.environ.get("NDBI046_ARTIFACTS", "./artifacts")
+MAX_SIZE = int(os.environ.get("NDBI046_ARTIFACTS_MAX_SIZE", 2 << 30))
+# recently used artifacts may still be inputs of a running DAG
+MIN_AGE = 3600
+
+CHUNK_SIZE = 1 << 20
+KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def artifacts_path() -> str:
+    return os.path.abspath(ARTIFACTS_PATH)
+
+
+def incoming_path(run_id: str, name: str) -> str:
+    # downloads land here before their content is known
+    directory = os.path.join(artifacts_path(), "incoming")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, re.sub(r"[^\w.-]", "_", f"{run_id}-{name}"))
+
+
+def _path(key: str, suffix: str) -> str:
+    return os.path.join(artifacts_path(), key[:2], key + suffix)
+
+
+def _key(path: str) -> str | None:
+    name = os.path.basename(path).split(".")[0]
+    return name if KEY.match(name) else None
+
+
+def content_digest(path: str) -> str:
+    # gzip headers carry a timestamp, compressed files are hashed decompressed
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        compressed = file.read(2) == b"\x1f\x8b"
+    with gzip.open(path, "rb") if compressed else open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def input_digest(path: str) -> str:
+    # artifacts are already named by their key, other files are hashed
+    path = os.path.abspath(path)
+    if path.startswith(artifacts_path() + os.sep) and _key(path):
+        return _key(path)
+    return content_digest(path)
+
+
+def _touch(path: str) -> None:
+    # the modification time orders artifacts for eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def add_file(path: str, suffix: str) -> str:
+    # moves a finished download under its content digest
+    target = _path(content_digest(path), suffix)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    return target
+
+
+def cached(
+    task: str,
+    inputs: list[str],
+    suffix: str,
+    build: Callable[[str], None],
+    **params,
+) -> str:
+    # the key covers the inputs, the parameters and the code of the task
+    with open(inspect.getsourcefile(build), "rb") as file:
+        code = hashlib.sha256(file.read()).hexdigest()
+    description = {
+        "task": task,
+        "code": code,
+        "inputs": [input_digest(path) for path in inputs],
+        "params": params,
+    }
+    key = hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    path = _path(key, suffix)
+    if os.path.exists(path):
+        print(f"{task}: reusing {path}")
+        _touch(path)
+        return path
+
+    # built next to the target and renamed, concurrent runs never see partial files
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = os.path.join(os.path.dirname(path), f"{key}.{uuid.uuid4().hex}.tmp{suffix}")
+    try:
+        build(temporary)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    print(f"{task}: stored {path}")
+    return path
+
+
+def evict(max_size: int = MAX_SIZE, min_age: int = MIN_AGE) -> int:
+    # least recently used artifacts go first until the store fits
+    files = []
+    for directory, _, names in os.walk(artifacts_path()):
+        if os.path.basename(directory) == "incoming":
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    now = time.time()
+    for mtime, size, path in sorted(files):
+        if total <= max_size or now - mtime < min_age:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
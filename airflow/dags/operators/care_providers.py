@@ -1,18 +1,24 @@
 import datetime
-import os
 
 import pandas as pd
 from rdflib import BNode, Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DCTERMS, QB, RDF, SKOS, XSD
 
+from cubes.sources import read_source
+from operators.artifacts import cached
+from operators.general import merge_shards, publish
 
-def clean_care_providers(file: str):
-    data = pd.read_csv(file, low_memory=False)
 
-    columns = ["Okres", "OkresCode", "Kraj", "KrajCode", "OborPece"]
-    data = data[columns].dropna()
+def clean_care_providers(file: str) -> str:
+    def build(output: str):
+        data = read_source(file, low_memory=False)
 
-    data.to_csv(file)
+        columns = ["Okres", "OkresCode", "Kraj", "KrajCode", "OborPece"]
+        data = data[columns].dropna()
+
+        data.to_csv(output)
+
+    return cached("clean_providers", [file], ".csv.gz", build)
 
 
 NS = Namespace("https://milan252525.github.io/ontology#")
@@ -23,16 +29,19 @@ SDMX_DIM = Namespace("http://purl.org/linked-data/sdmx/2009/dimension#")
 SDMX_CON = Namespace("http://purl.org/linked-data/sdmx/2009/concept#")
 SDMX_MES = Namespace("http://purl.org/linked-data/sdmx/2009/measure#")
 
+# one observation per group of these columns
+KEYS = ["OkresCode", "KrajCode", "OborPece"]
 
-def _create_datacube(data: pd.DataFrame) -> Graph:
+
+def _create_header(data: pd.DataFrame) -> Graph:
+    # everything except the observations, shared by all region shards
     cube = Graph()
     dimensions = _add_dimensions(cube)
     measures = _add_measures(cube)
     structure = _create_structure(cube, dimensions, measures)
-    dataset = _create_dataset(cube, structure)
+    _create_dataset(cube, structure)
 
     _create_resources(cube, data)
-    _create_observations(cube, dataset, data)
 
     return cube
 
@@ -97,19 +106,24 @@ def _add_measures(cube: Graph) -> list[URIRef]:
     return [number_of_care_providers]
 
 
+def _local_name(term: URIRef) -> str:
+    return str(term).split("#")[-1]
+
+
 def _create_structure(
     cube: Graph, dimensions: list[URIRef], measures: list[URIRef]
 ) -> URIRef:
     structure = NS.structure
     cube.add((structure, RDF.type, QB.DataStructureDefinition))
 
+    # labelled by structure and property, repeated runs give identical output
     for dimension in dimensions:
-        component = BNode()
+        component = BNode(_local_name(structure) + "-" + _local_name(dimension))
         cube.add((structure, QB.component, component))
         cube.add((component, QB.dimension, dimension))
 
     for measure in measures:
-        component = BNode()
+        component = BNode(_local_name(structure) + "-" + _local_name(measure))
         cube.add((structure, QB.component, component))
         cube.add((component, QB.measure, measure))
 
@@ -162,10 +176,16 @@ def _create_resources(cube: Graph, data: pd.DataFrame) -> None:
         cube.add((NSR[field], SKOS.prefLabel, Literal(str(row["OborPece"]), lang="cs")))
 
 
-def _create_observations(cube: Graph, dataset: URIRef, data: pd.DataFrame) -> None:
-    data = data.groupby(["OkresCode", "KrajCode", "OborPece"])
+def _create_observations(
+    cube: Graph, dataset: URIRef, data: pd.DataFrame, ids: pd.DataFrame
+) -> None:
+    counts = data.groupby(KEYS).size().rename("count").reset_index()
+    # numbered by the partition task, so the shards never share an observation IRI
+    counts = counts.merge(ids.reset_index(), on=KEYS)
 
-    for index, ((county, region, field_of_care), group) in enumerate(data):
+    for index, county, region, field_of_care, count in counts[
+        ["observation", *KEYS, "count"]
+    ].itertuples(index=False):
         resource = NSR["observation-" + str(index).zfill(4)]
         cube.add((resource, RDF.type, QB.Observation))
         cube.add((resource, QB.dataSet, dataset))
@@ -180,20 +200,48 @@ def _create_observations(cube: Graph, dataset: URIRef, data: pd.DataFrame) -> No
             (
                 resource,
                 NS.number_of_care_providers,
-                Literal(len(group), datatype=XSD.integer),
+                Literal(int(count), datatype=XSD.integer),
             )
         )
 
 
-def create_care_providers_datacube(data_file: str, **kwargs):
-    data = pd.read_csv(data_file)
+def partition_care_providers(data_file: str) -> list[dict]:
+    def build(output: str):
+        data = read_source(data_file, usecols=KEYS)
+        ids = data.groupby(KEYS).size().index.to_frame(index=False)
+        ids.index.name = "observation"
+        ids.to_csv(output)
 
-    cube = _create_datacube(data)
+    ids_file = cached("number_providers_observations", [data_file], ".csv.gz", build)
+    regions = sorted(read_source(ids_file, usecols=["KrajCode"])["KrajCode"].unique())
+    return [
+        {"data_file": data_file, "ids_file": ids_file, "region": region}
+        for region in regions
+    ]
 
-    output_path = kwargs["dag_run"].conf.get("output_path", "./out/")
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+def create_care_providers_shard(data_file: str, ids_file: str, region: str) -> str:
+    def build(output: str):
+        data = read_source(data_file)
+        data = data[data["KrajCode"] == region]
+        ids = read_source(ids_file, index_col="observation")
 
-    file_path = os.path.join(output_path, "health_care.ttl")
-    with open(file_path, "wb") as file:
-        cube.serialize(file, "ttl")
+        cube = Graph()
+        _create_observations(cube, NSR.dataCubeInstance, data, ids)
+
+        with open(output, "wb") as file:
+            cube.serialize(file, "nt", encoding="utf-8")
+
+    return cached(
+        "create_providers_shard", [data_file, ids_file], ".nt", build, region=region
+    )
+
+
+def merge_care_providers_datacube(data_file: str, shards: list[str], **kwargs) -> str:
+    def build(output: str):
+        header = _create_header(read_source(data_file))
+        merge_shards(header, shards, output)
+
+    cube_file = cached("merge_providers_cube", [data_file, *shards], ".ttl", build)
+    output_path = kwargs["dag_run"].conf.get("output_path", "./out/")
+    return publish(cube_file, output_path, "health_care.ttl")
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import shutil
+from typing import Any, AsyncIterator
+
+import aiohttp
+from airflow.exceptions import AirflowException
+from airflow.models import BaseOperator
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+from operators.artifacts import add_file, incoming_path
+from operators.general import CHUNK_SIZE, open_target
+
+# smaller files are not worth splitting into ranges
+MIN_PART_SIZE = 4 << 20
+
+
+async def _content_length(session: aiohttp.ClientSession, url: str) -> int | None:
+    # length of the file if the server can serve it in byte ranges
+    try:
+        async with session.head(url, allow_redirects=True) as response:
+            headers = response.headers
+            if (
+                response.status != 200
+                or headers.get("Accept-Ranges") != "bytes"
+                or "Content-Encoding" in headers
+                or "Content-Length" not in headers
+            ):
+                return None
+            return int(headers["Content-Length"])
+    except aiohttp.ClientError:
+        return None
+
+
+async def _write_response(response: aiohttp.ClientResponse, file) -> None:
+    # disk writes run in a thread so the event loop keeps serving other triggers
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        await asyncio.to_thread(file.write, chunk)
+
+
+async def _download_part(
+    session: aiohttp.ClientSession, url: str, path: str, start: int, end: int, retries: int
+) -> None:
+    # resumes from whatever an earlier attempt left in the part file
+    for attempt in range(retries + 1):
+        done = os.path.getsize(path) if os.path.exists(path) else 0
+        if start + done > end:
+            return
+        try:
+            headers = {"Range": f"bytes={start + done}-{end}"}
+            async with session.get(url, headers=headers) as response:
+                if response.status != 206:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info,
+                        response.history,
+                        status=response.status,
+                        message="Range request was not honoured",
+                    )
+                with open(path, "ab") as file:
+                    await _write_response(response, file)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(2**attempt)
+
+
+async def _download_whole(
+    session: aiohttp.ClientSession, url: str, path: str, retries: int
+) -> None:
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                first = await response.content.read(4)
+                file = await asyncio.to_thread(open_target, path, first)
+                with file:
+                    await asyncio.to_thread(file.write, first)
+                    await _write_response(response, file)
+            return
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(2**attempt)
+
+
+def _join_parts(path: str, part_paths: list[str], size: int) -> None:
+    if sum(os.path.getsize(part_path) for part_path in part_paths) != size:
+        for part_path in part_paths:
+            os.remove(part_path)
+        raise IOError(f"Downloaded {path} does not match the announced length {size}")
+
+    with open(part_paths[0], "rb") as part:
+        start = part.read(4)
+    with open_target(path, start) as file:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part:
+                shutil.copyfileobj(part, file, CHUNK_SIZE)
+            os.remove(part_path)
+
+
+async def download(url: str, path: str, parts: int = 4, retries: int = 3) -> int:
+    # ranged when the server allows it, without blocking a thread on the network
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+    connector = aiohttp.TCPConnector(ssl=False)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        size = await _content_length(session, url)
+        if size is None or size < MIN_PART_SIZE or parts < 2:
+            await _download_whole(session, url, path, retries)
+        else:
+            # part files are named after the length, a changed file is never resumed
+            bounds = [size * part // parts for part in range(parts + 1)]
+            part_paths = [f"{path}.{size}.part{part}" for part in range(parts)]
+            await asyncio.gather(
+                *(
+                    _download_part(
+                        session, url, part_path, bounds[part], bounds[part + 1] - 1, retries
+                    )
+                    for part, part_path in enumerate(part_paths)
+                )
+            )
+            await asyncio.to_thread(_join_parts, path, part_paths, size)
+    return os.path.getsize(path)
+
+
+class DownloadTrigger(BaseTrigger):
+    def __init__(self, url: str, path: str, parts: int = 4, retries: int = 3):
+        super().__init__()
+        self.url = url
+        self.path = path
+        self.parts = parts
+        self.retries = retries
+
+    def serialize(self) -> tuple[str, dict[str, Any]]:
+        return (
+            "operators.download.DownloadTrigger",
+            {"url": self.url, "path": self.path, "parts": self.parts, "retries": self.retries},
+        )
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        try:
+            byte_size = await download(self.url, self.path, self.parts, self.retries)
+        except Exception as error:
+            yield TriggerEvent({"status": "error", "message": f"{type(error).__name__}: {error}"})
+            return
+        yield TriggerEvent({"status": "success", "path": self.path, "byte_size": byte_size})
+
+
+class DeferrableDownloadOperator(BaseOperator):
+    # the transfer runs in the triggerer, the worker slot is free meanwhile
+    template_fields = ("url", "name")
+
+    def __init__(self, url: str, name: str, parts: int = 4, retries: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.name = name
+        self.parts = parts
+        self.retries = retries
+
+    def execute(self, context):
+        # absolute, the triggerer has its own working directory
+        path = incoming_path(context["run_id"], self.name)
+        self.defer(
+            trigger=DownloadTrigger(self.url, path, self.parts, self.retries),
+            method_name="execute_complete",
+        )
+
+    def execute_complete(self, context, event: dict[str, Any]) -> str:
+        if event["status"] != "success":
+            raise AirflowException(f"Download of {self.url} failed: {event['message']}")
+        self.log.info("Downloaded %s (%d bytes)", event["path"], event["byte_size"])
+        # stored under its content, unchanged sources keep downstream keys
+        suffix = self.name[self.name.index(".") :] if "." in self.name else ""
+        return add_file(event["path"], suffix)
@@ -1,47 +1,76 @@
+import gzip
 import os
 import shutil
+from typing import BinaryIO
 
-import pandas as pd
-import requests
+from rdflib import Graph
 
+from cubes.sources import read_source
+from operators.artifacts import cached, evict, incoming_path
 
-def download_file(url: str, name: str):
-    response = requests.get(url, verify=False, timeout=300)
-    if not os.path.exists("./tmp"):
-        os.makedirs("./tmp")
+CHUNK_SIZE = 1 << 20
 
-    with open(os.path.join("./tmp", name), "wb") as file:
-        file.write(response.content)
 
+def open_target(path: str, start: bytes) -> BinaryIO:
+    # a plain download stored under a .gz name is compressed on the way to disk
+    if path.endswith(".gz") and not start.startswith(b"\x1f\x8b"):
+        return gzip.open(path, "wb", compresslevel=6)
+    return open(path, "wb")
 
-def cleanup():
-    shutil.rmtree("./tmp")
 
+def merge_shards(header: Graph, shards: list[str], output: str) -> None:
+    # N-Triples are valid Turtle, the shards are appended after the header
+    with open(output, "wb") as file:
+        header.serialize(file, "ttl")
+        file.write(b"\n")
+        for shard in shards:
+            with open(shard, "rb") as part:
+                shutil.copyfileobj(part, file, CHUNK_SIZE)
 
-def edit_enum(enum_path: str, cp_path: str):
-    regions = pd.read_csv(cp_path)
-    enum = pd.read_csv(enum_path)
 
-    new_enum = pd.DataFrame(
-        columns=["LAU", "NUTS", "CountyName", "RegionCode", "RegionName"]
-    )
+def publish(artifact: str, output_path: str, name: str) -> str:
+    os.makedirs(output_path, exist_ok=True)
+    file_path = os.path.join(output_path, name)
+    shutil.copyfile(artifact, file_path)
+    return file_path
 
-    code_map = {}
-    for _, row in (
-        regions[["KrajCode", "OkresCode", "Kraj", "Okres"]]
-        .drop_duplicates()
-        .dropna()
-        .iterrows()
-    ):
-        code_map[row["OkresCode"]] = (row["Okres"], row["KrajCode"], row["Kraj"])
 
-    for i, row in enum.drop_duplicates().dropna().iterrows():
-        lau = row["CHODNOTA2"]
-        nuts = row["CHODNOTA1"]
+def cleanup(**kwargs):
+    # leftovers of this run's downloads, artifacts stay for the next runs
+    prefix = incoming_path(kwargs["run_id"], "")
+    incoming = os.path.dirname(prefix)
+    for name in os.listdir(incoming):
+        path = os.path.join(incoming, name)
+        if path.startswith(prefix):
+            os.remove(path)
+    removed = evict()
+    print(f"Evicted {removed} artifacts")
 
-        try:
-            new_enum.loc[i] = [lau, nuts, *code_map[nuts]]
-        except KeyError:
-            continue
 
-    new_enum.to_csv(enum_path)
+def edit_enum(enum_path: str, cp_path: str) -> str:
+    def build(output: str):
+        regions = read_source(cp_path)
+        enum = read_source(enum_path)
+
+        # one row per county, same mapping as the code list index used by the cubes
+        code_map = (
+            regions[["OkresCode", "Okres", "KrajCode", "Kraj"]]
+            .dropna()
+            .drop_duplicates("OkresCode")
+        )
+
+        lau_codes = enum[["CHODNOTA2", "CHODNOTA1"]].dropna().drop_duplicates()
+        # counties without a region drop out of the population cube, e.g. Extra-Regio
+        unmatched = ~lau_codes["CHODNOTA1"].isin(code_map["OkresCode"])
+        if unmatched.any():
+            codes = ", ".join(sorted(lau_codes.loc[unmatched, "CHODNOTA1"].astype(str)))
+            print(f"edit_enum: skipping counties without a region in the register: {codes}")
+
+        new_enum = lau_codes.merge(
+            code_map, left_on="CHODNOTA1", right_on="OkresCode", how="inner"
+        ).drop(columns="OkresCode")
+        new_enum.columns = ["LAU", "NUTS", "CountyName", "RegionCode", "RegionName"]
+
+        new_enum.to_csv(output)
+
+    return cached("edit_enum", [enum_path, cp_path], ".csv.gz", build)
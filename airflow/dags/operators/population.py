@@ -1,20 +1,26 @@
 import datetime
-import os
 
 import pandas as pd
 from rdflib import BNode, Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DCTERMS, QB, RDF, SKOS, XSD
 
+from cubes.sources import read_source
+from operators.artifacts import cached
+from operators.general import merge_shards, publish
 
-def clean_population(file: str):
-    data = pd.read_csv(file, low_memory=False)
 
-    data = data[(data["vuk"] == "DEM0004") & (data["vuzemi_cis"] == 101)]
+def clean_population(file: str) -> str:
+    def build(output: str):
+        data = read_source(file, low_memory=False)
 
-    columns = ["hodnota", "vuzemi_kod"]
-    data = data[columns].dropna()
+        data = data[(data["vuk"] == "DEM0004") & (data["vuzemi_cis"] == 101)]
 
-    data.to_csv(file)
+        columns = ["hodnota", "vuzemi_kod"]
+        data = data[columns].dropna()
+
+        data.to_csv(output)
+
+    return cached("clean_population", [file], ".csv.gz", build)
 
 
 NS = Namespace("https://milan252525.github.io/ontology#")
@@ -73,19 +79,24 @@ def _add_measures(cube: Graph) -> list[URIRef]:
     return [mean_population]
 
 
+def _local_name(term: URIRef) -> str:
+    return str(term).split("#")[-1]
+
+
 def _create_structure(
     cube: Graph, dimensions: list[URIRef], measures: list[URIRef]
 ) -> URIRef:
     structure = NS.structure
     cube.add((structure, RDF.type, QB.DataStructureDefinition))
 
+    # labelled by structure and property, repeated runs give identical output
     for dimension in dimensions:
-        component = BNode()
+        component = BNode(_local_name(structure) + "-" + _local_name(dimension))
         cube.add((structure, QB.component, component))
         cube.add((component, QB.dimension, dimension))
 
     for measure in measures:
-        component = BNode()
+        component = BNode(_local_name(structure) + "-" + _local_name(measure))
         cube.add((structure, QB.component, component))
         cube.add((component, QB.measure, measure))
 
@@ -152,29 +163,52 @@ def _create_observations(
         )
 
 
-def _create_datacube(data: pd.DataFrame, enum_data: pd.DataFrame) -> Graph:
+def _create_header(enum_data: pd.DataFrame) -> Graph:
+    # everything except the observations, shared by all region shards
     cube = Graph()
     dimensions = _add_dimensions(cube)
     measures = _add_measures(cube)
     structure = _create_structure(cube, dimensions, measures)
-    dataset = _create_dataset(cube, structure)
+    _create_dataset(cube, structure)
 
     _create_resources(cube, enum_data)
-    _create_observations(cube, dataset, data, enum_data)
 
     return cube
 
 
-def create_population_datacube(data_file: str, enum_data: str, **kwargs):
-    data = pd.read_csv(data_file)
-    enum_data = pd.read_csv(enum_data)
+def partition_population(data_file: str, enum_file: str) -> list[dict]:
+    enum_data = read_source(enum_file)
+    regions = sorted(enum_data["RegionCode"].unique())
+    return [
+        {"data_file": data_file, "enum_file": enum_file, "region": region}
+        for region in regions
+    ]
 
-    cube = _create_datacube(data, enum_data)
 
-    output_path = kwargs["dag_run"].conf.get("output_path", "./out/")
+def create_population_shard(data_file: str, enum_file: str, region: str) -> str:
+    def build(output: str):
+        data = read_source(data_file)
+        enum_data = read_source(enum_file)
+
+        counties = enum_data.loc[enum_data["RegionCode"] == region, "LAU"]
+        data = data[data["vuzemi_kod"].isin(counties)]
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        cube = Graph()
+        _create_observations(cube, NSR.dataCubeInstance, data, enum_data)
 
-    file_path = os.path.join(output_path, "population.ttl")
-    with open(file_path, "wb") as file:
-        cube.serialize(file, "ttl")
+        with open(output, "wb") as file:
+            cube.serialize(file, "nt", encoding="utf-8")
+
+    return cached(
+        "create_population_shard", [data_file, enum_file], ".nt", build, region=region
+    )
+
+
+def merge_population_datacube(enum_file: str, shards: list[str], **kwargs) -> str:
+    def build(output: str):
+        header = _create_header(read_source(enum_file))
+        merge_shards(header, shards, output)
+
+    cube_file = cached("merge_population_cube", [enum_file, *shards], ".ttl", build)
+    output_path = kwargs["dag_run"].conf.get("output_path", "./out/")
+    return publish(cube_file, output_path, "population.ttl")
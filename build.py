@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from rdflib import Graph
+
+import provenance
+import queries
+from cubes import care_providers, codelist, contracts, population, provider_rates
+from cubes.canonical import modification_date
+from cubes.distribution import write_graph
+from cubes.lineage import write_lineage
+from cubes.snapshot import write_snapshot
+from vocabs import dcat_dataset, skos_hierarchy
+
+# inputs loaded once in the main process, forked workers inherit them
+SHARED = {}
+OPTIONS = {"rollup": False, "modified": None, "lineage": False}
+
+
+def shared(name: str):
+    # workers started without fork load the inputs on their own
+    if name not in SHARED:
+        SHARED[name] = INPUTS[name][0]()
+    return SHARED[name]
+
+
+def load_codelist() -> codelist.CountyIndex:
+    return codelist.load_index(care_providers=shared("register"))
+
+
+def check_contracts() -> None:
+    # fails before the code list index or any triple is built
+    contracts.enforce(
+        shared("register"), shared("population_data"), shared("county_codelist")
+    )
+
+
+# name -> (loader, dependencies), loaded in the main process
+INPUTS = {
+    "register": (care_providers.load_data, []),
+    "population_data": (population.load_data, []),
+    "county_codelist": (contracts.load_codelist, []),
+    "contracts": (
+        check_contracts,
+        ["register", "population_data", "county_codelist"],
+    ),
+    "codelist": (load_codelist, ["register", "contracts"]),
+}
+
+
+def build_care_providers() -> None:
+    frame = care_providers.create_frame(
+        shared("register"),
+        shared("codelist"),
+        OPTIONS["rollup"],
+        OPTIONS["modified"],
+    )
+    cube = frame.to_graph()
+    metadata = write_graph(cube, "out/care_providers.ttl")
+    write_snapshot(cube, "out/care_providers.ttl")
+    print(f"Generated out/care_providers.ttl ({metadata['byte_size']} bytes)")
+    if OPTIONS["lineage"]:
+        lineage = care_providers.create_lineage(shared("register"), frame)
+        path = write_lineage(
+            "out/care_providers.ttl", [care_providers.SOURCE_CARE_PROVIDERS], lineage
+        )
+        print(f"Recorded lineage into {path}")
+
+
+def build_population() -> None:
+    cube = population.create_datacube(
+        shared("population_data"), shared("codelist"), OPTIONS["modified"]
+    )
+    metadata = write_graph(cube, "out/population.ttl")
+    write_snapshot(cube, "out/population.ttl")
+    print(f"Generated out/population.ttl ({metadata['byte_size']} bytes)")
+    if OPTIONS["lineage"]:
+        sources = population.SOURCES_POPULATION
+        lineage = population.create_lineage(shared("population_data"), sources)
+        path = write_lineage("out/population.ttl", sources, lineage)
+        print(f"Recorded lineage into {path}")
+
+
+def build_provider_rates() -> None:
+    cube = provider_rates.create_datacube(
+        shared("register"),
+        shared("population_data"),
+        shared("codelist"),
+        OPTIONS["modified"],
+    )
+    metadata = write_graph(cube, "out/provider_rates.ttl")
+    write_snapshot(cube, "out/provider_rates.ttl")
+    print(f"Generated out/provider_rates.ttl ({metadata['byte_size']} bytes)")
+
+
+def build_skos_hierarchy() -> None:
+    graph = skos_hierarchy.create_hierarchy(Graph())
+    graph = skos_hierarchy.add_resources(shared("codelist"), graph)
+    metadata = write_graph(graph, "out/skos_hierarchy.ttl")
+    print(f"Generated out/skos_hierarchy.ttl ({metadata['byte_size']} bytes)")
+
+
+def validate() -> None:
+    cubes = queries.load_cubes(
+        ["out/care_providers.ttl", "out/population.ttl", "out/provider_rates.ttl"]
+    )
+    for cube in cubes:
+        print(cube.name.upper())
+        queries.bind_prefixes(cube)
+        queries.run_qb_check(cube, queries.queries)
+
+
+# name -> (builder, dependencies), run in the worker pool
+ARTIFACTS = {
+    "care_providers": (build_care_providers, ["register", "codelist"]),
+    "population": (build_population, ["population_data", "codelist"]),
+    "provider_rates": (
+        build_provider_rates,
+        ["register", "population_data", "codelist"],
+    ),
+    "skos_hierarchy": (build_skos_hierarchy, ["codelist"]),
+    # links the lineage sidecars written by the cubes
+    "provenance": (provenance.main, ["care_providers", "population"]),
+    "dcat_dataset": (
+        dcat_dataset.main,
+        ["care_providers", "population", "skos_hierarchy"],
+    ),
+    "queries": (validate, ["care_providers", "population", "provider_rates"]),
+}
+
+
+def dependencies(name: str) -> list[str]:
+    if name in INPUTS:
+        return INPUTS[name][1]
+    return ARTIFACTS[name][1]
+
+
+def run_task(name: str) -> tuple[str, float, str]:
+    start = time.perf_counter()
+    if name in INPUTS:
+        shared(name)
+        return name, time.perf_counter() - start, ""
+
+    # artifacts run in their own process, so their output can be captured
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ARTIFACTS[name][0]()
+    return name, time.perf_counter() - start, output.getvalue()
+
+
+def select(targets: list[str]) -> list[str]:
+    # targets with everything they depend on
+    selected = []
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.append(name)
+            pending.extend(dependencies(name))
+    return selected
+
+
+def run_graph(names: list[str], executor, durations: dict[str, float]) -> None:
+    done = set(durations)
+    running = {}
+    waiting = list(names)
+
+    while waiting or running:
+        for name in list(waiting):
+            if all(dep in done or dep not in names for dep in dependencies(name)):
+                waiting.remove(name)
+                running[executor.submit(run_task, name)] = name
+
+        finished, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in finished:
+            name, duration, output = future.result()
+            del running[future]
+            done.add(name)
+            durations[name] = duration
+            print(f"[{name}] done in {duration:.2f}s")
+            if output.strip():
+                print(output.rstrip())
+
+
+def critical_path(names: list[str], durations: dict[str, float]) -> tuple[float, list]:
+    finish = {}
+    path = {}
+
+    def visit(name: str) -> float:
+        if name not in finish:
+            deps = [dep for dep in dependencies(name) if dep in names]
+            before = max(deps, key=visit, default=None)
+            finish[name] = durations[name] + (visit(before) if before else 0.0)
+            path[name] = (path[before] if before else []) + [name]
+        return finish[name]
+
+    last = max(names, key=visit)
+    return finish[last], path[last]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build all data cube artifacts")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help=f"artifacts to build with their dependencies ({', '.join(ARTIFACTS)}), "
+        "all by default",
+    )
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--rollup", action="store_true")
+    parser.add_argument("--modified", metavar="YYYY-MM-DD")
+    parser.add_argument("--lineage", action="store_true")
+    args = parser.parse_args()
+    for target in args.targets:
+        if target not in ARTIFACTS:
+            parser.error(f"unknown artifact {target}")
+
+    OPTIONS["rollup"] = args.rollup
+    OPTIONS["modified"] = modification_date(args.modified)
+    OPTIONS["lineage"] = args.lineage
+
+    names = select(args.targets or list(ARTIFACTS))
+    inputs = [name for name in names if name in INPUTS]
+    artifacts = [name for name in names if name in ARTIFACTS]
+    durations = {}
+
+    start = time.perf_counter()
+    # shared inputs are loaded in threads of this process
+    try:
+        with ThreadPoolExecutor(max_workers=len(INPUTS)) as executor:
+            run_graph(inputs, executor, durations)
+    except contracts.ContractError as error:
+        parser.exit(1, f"{error}\n")
+
+    # forked workers start after the inputs are loaded and share them
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as executor:
+        run_graph(artifacts, executor, durations)
+    wall_time = time.perf_counter() - start
+
+    length, path = critical_path(names, durations)
+    print()
+    print(f"Wall time: {wall_time:.2f}s, sum of task times: {sum(durations.values()):.2f}s")
+    print(f"Critical path ({length:.2f}s): {' -> '.join(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import datetime
+import os
+
+from rdflib import BNode, URIRef
+
+
+def local_name(term: URIRef) -> str:
+    return str(term).replace("#", "/").split("/")[-1]
+
+
+def stable_bnode(*terms: URIRef) -> BNode:
+    # labelled by the terms it connects instead of a random id,
+    # so repeated runs produce identical output
+    return BNode("-".join(local_name(term) for term in terms))
+
+
+def modification_date(value: str | None = None) -> datetime.date:
+    # an explicit date or SOURCE_DATE_EPOCH pins dcterms:modified
+    if value:
+        return datetime.date.fromisoformat(value)
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc).date()
+    return datetime.date.today()
+
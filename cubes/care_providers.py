@@ -1,10 +1,22 @@
+import argparse
 import datetime
-import os
 
 import pandas as pd
-from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DCTERMS, QB, RDF, SKOS, XSD
 
+from cubes import contracts
+from cubes.canonical import local_name, modification_date, stable_bnode
+from cubes.codelist import CountyIndex, load_index
+from cubes.csvw import write_csvw
+from cubes.distribution import write_graph
+from cubes.frame import CubeFrame
+from cubes.lineage import group_rows, write_lineage
+from cubes.partitions import filter_regions, write_partitions
+from cubes.snapshot import write_snapshot
+from cubes.sources import read_source
+from cubes.store import create_graph
+
 SOURCE_CARE_PROVIDERS = "data/narodni-registr-poskytovatelu-zdravotnich-sluzeb.csv"
 
 NS = Namespace("https://milan252525.github.io/ontology#")
@@ -20,24 +32,114 @@ COUNTY_CODE = "OkresCode"
 REGION = "Kraj"
 REGION_CODE = "KrajCode"
 FIELD_OF_CARE = "OborPece"
+PROVIDER = "Ico"
+FACILITY_TYPE = "DruhZarizeni"
+LEGAL_FORM = "PravniFormaKod"
+
+# column names of the CubeFrame, same as the local names of the properties
+DIMENSIONS = ["county", "region", "field_of_care"]
+
+# measure -> (register column, aggregation, additive, label cs, label en),
+# only additive measures can be summed up into the region and country rollups
+MEASURE_DEFINITIONS = {
+    "number_of_care_providers": (
+        FIELD_OF_CARE,
+        "size",
+        True,
+        "Počet poskytovatelů péče",
+        "Number of care providers",
+    ),
+    "number_of_providers": (
+        PROVIDER,
+        "nunique",
+        False,
+        "Počet různých poskytovatelů (IČO)",
+        "Number of distinct providers (IČO)",
+    ),
+    "number_of_facility_types": (
+        FACILITY_TYPE,
+        "nunique",
+        False,
+        "Počet druhů zařízení",
+        "Number of facility types",
+    ),
+    "number_of_legal_forms": (
+        LEGAL_FORM,
+        "nunique",
+        False,
+        "Počet právních forem",
+        "Number of legal forms",
+    ),
+}
+MEASURES = list(MEASURE_DEFINITIONS)
+# the published cube keeps its single measure, the others are opt-in
+DEFAULT_MEASURES = ["number_of_care_providers"]
 
 
 def load_data() -> pd.DataFrame:
     # low_memory because the data has variable data types in columns
-    return pd.read_csv(SOURCE_CARE_PROVIDERS, low_memory=False)
+    return read_source(SOURCE_CARE_PROVIDERS, low_memory=False)
+
+
+def create_frame(
+    data: pd.DataFrame,
+    codelist: CountyIndex | None = None,
+    rollup: bool = False,
+    modified: datetime.date | None = None,
+    measures: list[str] | None = None,
+) -> CubeFrame:
+    if codelist is None:
+        codelist = load_index()
+    measures = measures or DEFAULT_MEASURES
+
+    # every measure comes from the same grouping of the projected columns
+    keys = [COUNTY_CODE, REGION_CODE, FIELD_OF_CARE]
+    sources = {MEASURE_DEFINITIONS[measure][0] for measure in measures}
+    projected = data[keys + sorted(sources - set(keys))]
+    aggregations = {
+        measure: MEASURE_DEFINITIONS[measure][:2] for measure in measures
+    }
+    columns = projected.groupby(keys).agg(**aggregations).reset_index()
+    columns.columns = DIMENSIONS + measures
+
+    return CubeFrame(
+        columns,
+        DIMENSIONS,
+        measures,
+        lambda columns: build_datacube(columns, codelist, rollup, modified),
+        [measure for measure in measures if MEASURE_DEFINITIONS[measure][2]],
+    )
+
 
+def create_datacube(
+    data: pd.DataFrame,
+    codelist: CountyIndex | None = None,
+    rollup: bool = False,
+    modified: datetime.date | None = None,
+    measures: list[str] | None = None,
+) -> Graph:
+    return create_frame(data, codelist, rollup, modified, measures).to_graph()
 
-def create_datacube(data: pd.DataFrame) -> Graph:
-    cube = Graph()
+
+def build_datacube(
+    columns: pd.DataFrame,
+    codelist: CountyIndex,
+    rollup: bool = False,
+    modified: datetime.date | None = None,
+) -> Graph:
+    cube = create_graph()
     dimensions = add_dimensions(cube)
-    measures = add_measures(cube)
+    measures = add_measures(cube, [name for name in MEASURES if name in columns])
     structure = create_structure(cube, dimensions, measures)
-    dataset = create_dataset(cube, structure)
+    slice_keys = add_slice_keys(cube, structure)
+    dataset = create_dataset(cube, structure, modified=modified)
 
-    create_resources(cube, data)
-    create_observations(
-        cube, dataset, data.groupby([COUNTY_CODE, REGION_CODE, FIELD_OF_CARE])
-    )
+    create_resources(cube, columns, codelist)
+    members = create_observations(cube, dataset, columns)
+    create_slices(cube, dataset, slice_keys, members)
+
+    if rollup:
+        create_rollups(cube, columns, codelist, dimensions, measures, modified)
 
     return cube
 
@@ -85,53 +187,82 @@ def add_dimensions(cube: Graph) -> list[URIRef]:
     return [county, region, field_of_care]
 
 
-def add_measures(cube: Graph) -> list[URIRef]:
-    number_of_care_providers = NS.number_of_care_providers
+def add_measures(cube: Graph, names: list[str] = MEASURES) -> list[URIRef]:
+    measures = []
+    for name in names:
+        _, _, _, label_cs, label_en = MEASURE_DEFINITIONS[name]
+        measure = NS[name]
+        properties = [
+            (RDF.type, RDFS.Property),
+            (RDF.type, QB.MeasureProperty),
+            (RDFS.label, Literal(label_cs, lang="cs")),
+            (RDFS.label, Literal(label_en, lang="en")),
+            (RDFS.range, XSD.integer),
+            (RDFS.subPropertyOf, SDMX_MES.obsValue),
+        ]
+        for prop in properties:
+            cube.add((measure, *prop))
+        measures.append(measure)
 
-    properties = [
-        (RDF.type, RDFS.Property),
-        (RDF.type, QB.MeasureProperty),
-        (RDFS.label, Literal("Počet poskytovatelů péče", lang="cs")),
-        (RDFS.label, Literal("Number of care providers", lang="en")),
-        (RDFS.range, XSD.integer),
-        (RDFS.subPropertyOf, SDMX_MES.obsValue),
-    ]
-    for prop in properties:
-        cube.add((number_of_care_providers, *prop))
-
-    return [number_of_care_providers]
+    return measures
 
 
 def create_structure(
-    cube: Graph, dimensions: list[URIRef], measures: list[URIRef]
+    cube: Graph,
+    dimensions: list[URIRef],
+    measures: list[URIRef],
+    structure: URIRef = NS.structure,
 ) -> URIRef:
-    structure = NS.structure
     cube.add((structure, RDF.type, QB.DataStructureDefinition))
 
     for dimension in dimensions:
-        component = BNode()
+        component = stable_bnode(structure, dimension)
         cube.add((structure, QB.component, component))
         cube.add((component, QB.dimension, dimension))
 
     for measure in measures:
-        component = BNode()
+        component = stable_bnode(structure, measure)
         cube.add((structure, QB.component, component))
         cube.add((component, QB.measure, measure))
 
     return structure
 
 
-def create_dataset(cube: Graph, structure: URIRef) -> URIRef:
-    dataset = NSR.careProvidersDataCubeInstance
+def add_slice_keys(cube: Graph, structure: URIRef) -> dict[URIRef, URIRef]:
+    slice_keys = {
+        NS.region: (NS.sliceByRegion, "Slice by region", "Řez podle kraje"),
+        NS.field_of_care: (
+            NS.sliceByFieldOfCare,
+            "Slice by field of care",
+            "Řez podle oboru péče",
+        ),
+    }
+    for dimension, (slice_key, label_en, label_cs) in slice_keys.items():
+        cube.add((slice_key, RDF.type, QB.SliceKey))
+        cube.add((slice_key, RDFS.label, Literal(label_en, lang="en")))
+        cube.add((slice_key, RDFS.label, Literal(label_cs, lang="cs")))
+        cube.add((slice_key, QB.componentProperty, dimension))
+        cube.add((structure, QB.sliceKey, slice_key))
+
+    return {dimension: slice_key for dimension, (slice_key, *_) in slice_keys.items()}
+
+
+def create_dataset(
+    cube: Graph,
+    structure: URIRef,
+    dataset: URIRef = NSR.careProvidersDataCubeInstance,
+    label_en: str = "Care providers",
+    label_cs: str = "Poskytovatelé zdravotních služeb",
+    modified: datetime.date | None = None,
+    issued: datetime.date | None = None,
+) -> URIRef:
     cube.add((dataset, RDF.type, QB.DataSet))
-    cube.add((dataset, RDFS.label, Literal("Care providers", lang="en")))
-    cube.add(
-        (dataset, RDFS.label, Literal("Poskytovatelé zdravotních služeb", lang="cs"))
-    )
+    cube.add((dataset, RDFS.label, Literal(label_en, lang="en")))
+    cube.add((dataset, RDFS.label, Literal(label_cs, lang="cs")))
     cube.add((dataset, QB.structure, structure))
 
-    issued = datetime.date(2023, 3, 11)
-    curr_date = datetime.date.today().isoformat()
+    issued = issued or datetime.date(2023, 3, 11)
+    curr_date = (modified or modification_date()).isoformat()
     cube.add((dataset, DCTERMS.issued, Literal(issued, datatype=XSD.date)))
     cube.add((dataset, DCTERMS.modified, Literal(curr_date, datatype=XSD.date)))
 
@@ -151,42 +282,160 @@ def serialize_to_string(obj: any) -> str:
     return str(obj).strip().replace(", ", ",").replace(" ", "_").lower()
 
 
-def create_resources(cube: Graph, data: pd.DataFrame) -> None:
-    for _, row in data[[COUNTY, COUNTY_CODE]].drop_duplicates().dropna().iterrows():
-        county = serialize_to_string(row[COUNTY_CODE])
-        cube.add((NSR[county], SKOS.prefLabel, Literal(str(row[COUNTY]), lang="cs")))
+def create_resources(
+    cube: Graph, columns: pd.DataFrame, codelist: CountyIndex
+) -> None:
+    for code in columns["county"].unique():
+        county = serialize_to_string(code)
+        label = codelist.county_label(code)
+        cube.add((NSR[county], SKOS.prefLabel, Literal(label, lang="cs")))
 
-    for _, row in data[[REGION, REGION_CODE]].drop_duplicates().dropna().iterrows():
-        region = serialize_to_string(row[REGION_CODE])
-        cube.add((NSR[region], SKOS.prefLabel, Literal(str(row[REGION]), lang="cs")))
+    for code in columns["region"].unique():
+        region = serialize_to_string(code)
+        label = codelist.region_label(code)
+        cube.add((NSR[region], SKOS.prefLabel, Literal(label, lang="cs")))
 
-    for _, row in data[[FIELD_OF_CARE]].drop_duplicates().dropna().iterrows():
-        field = serialize_to_string(row[FIELD_OF_CARE])
-        cube.add(
-            (NSR[field], SKOS.prefLabel, Literal(str(row[FIELD_OF_CARE]), lang="cs"))
-        )
+    for label in columns["field_of_care"].unique():
+        field = serialize_to_string(label)
+        cube.add((NSR[field], SKOS.prefLabel, Literal(str(label), lang="cs")))
 
 
-def create_observations(cube: Graph, dataset: URIRef, data: pd.DataFrame) -> None:
-    for index, ((county, region, field_of_care), group) in enumerate(data):
+def create_observations(
+    cube: Graph, dataset: URIRef, columns: pd.DataFrame
+) -> dict[tuple[URIRef, URIRef], list[URIRef]]:
+    # observations grouped by (dimension, value), used to build the slices
+    members = {}
+    measures = [NS[name] for name in MEASURES if name in columns]
+
+    rows = columns[DIMENSIONS + [local_name(measure) for measure in measures]].itertuples(
+        index=False
+    )
+    for index, (county, region, field_of_care, *values) in zip(columns.index, rows):
         resource = NSR["observation-" + str(index).zfill(4)]
+        region = NSR[serialize_to_string(region)]
+        field_of_care = NSR[serialize_to_string(field_of_care)]
+
         cube.add((resource, RDF.type, QB.Observation))
         cube.add((resource, QB.dataSet, dataset))
         cube.add((resource, QB.dataSet, dataset))
         cube.add((resource, NS.county, NSR[serialize_to_string(county)]))
-        cube.add((resource, NS.region, NSR[serialize_to_string(region)]))
-        cube.add((resource, NS.field_of_care, NSR[serialize_to_string(field_of_care)]))
-        cube.add(
-            (
-                resource,
-                NS.number_of_care_providers,
-                Literal(len(group), datatype=XSD.integer),
-            )
+        cube.add((resource, NS.region, region))
+        cube.add((resource, NS.field_of_care, field_of_care))
+        for measure, value in zip(measures, values):
+            cube.add((resource, measure, Literal(int(value), datatype=XSD.integer)))
+
+        members.setdefault((NS.region, region), []).append(resource)
+        members.setdefault((NS.field_of_care, field_of_care), []).append(resource)
+
+    return members
+
+
+def create_slices(
+    cube: Graph,
+    dataset: URIRef,
+    slice_keys: dict[URIRef, URIRef],
+    members: dict[tuple[URIRef, URIRef], list[URIRef]],
+) -> None:
+    for (dimension, value), observations in members.items():
+        dimension_name = dimension.split("#")[-1]
+        value_name = value.split("/")[-1]
+        resource = NSR["slice-" + dimension_name + "-" + value_name]
+
+        cube.add((resource, RDF.type, QB.Slice))
+        cube.add((resource, QB.sliceStructure, slice_keys[dimension]))
+        cube.add((resource, dimension, value))
+        cube.add((dataset, QB.slice, resource))
+        for observation in observations:
+            cube.add((resource, QB.observation, observation))
+
+
+def create_rollups(
+    cube: Graph,
+    columns: pd.DataFrame,
+    codelist: CountyIndex,
+    dimensions: list[URIRef],
+    measures: list[URIRef],
+    modified: datetime.date | None = None,
+) -> None:
+    county, region, field_of_care = dimensions
+
+    # distinct counts of the counties cannot be summed, those stay county only
+    measures = [
+        measure for measure in measures if MEASURE_DEFINITIONS[local_name(measure)][2]
+    ]
+    names = [local_name(measure) for measure in measures]
+
+    # regions are taken from the county -> region hierarchy, not the register rows
+    regions = {code: info["region"] for code, info in codelist.counties.items()}
+    county_regions = columns["county"].astype(str).map(regions)
+    # a dropped county would make the totals disagree with the base cube
+    unmapped = columns.loc[county_regions.isna(), "county"].astype(str).unique()
+    if len(unmapped):
+        raise ValueError(
+            f"Counties missing in the code list, cannot roll up: {', '.join(sorted(unmapped))}"
         )
+    by_region = (
+        columns.assign(region=county_regions)
+        .groupby(["region", "field_of_care"], observed=True)[names]
+        .sum()
+    )
+    by_country = by_region.groupby(level="field_of_care", observed=True).sum()
 
+    structure = create_structure(
+        cube, [region, field_of_care], measures, NS.structureRegion
+    )
+    dataset = create_dataset(
+        cube,
+        structure,
+        NSR.careProvidersRegionDataCubeInstance,
+        "Care providers by region",
+        "Poskytovatelé zdravotních služeb podle krajů",
+        modified,
+    )
+    for index, ((region_code, field), values) in enumerate(by_region.iterrows()):
+        resource = NSR["observation-region-" + str(index).zfill(4)]
+        cube.add((resource, RDF.type, QB.Observation))
+        cube.add((resource, QB.dataSet, dataset))
+        cube.add((resource, NS.region, NSR[serialize_to_string(region_code)]))
+        cube.add((resource, NS.field_of_care, NSR[serialize_to_string(field)]))
+        for measure, value in zip(measures, values):
+            cube.add((resource, measure, Literal(int(value), datatype=XSD.integer)))
+
+    structure = create_structure(cube, [field_of_care], measures, NS.structureCountry)
+    dataset = create_dataset(
+        cube,
+        structure,
+        NSR.careProvidersCountryDataCubeInstance,
+        "Care providers in the Czech Republic",
+        "Poskytovatelé zdravotních služeb v České republice",
+        modified,
+    )
+    for index, (field, values) in enumerate(by_country.iterrows()):
+        resource = NSR["observation-country-" + str(index).zfill(4)]
+        cube.add((resource, RDF.type, QB.Observation))
+        cube.add((resource, QB.dataSet, dataset))
+        cube.add((resource, NS.field_of_care, NSR[serialize_to_string(field)]))
+        for measure, value in zip(measures, values):
+            cube.add((resource, measure, Literal(int(value), datatype=XSD.integer)))
+
+
+def create_lineage(
+    data: pd.DataFrame, frame: CubeFrame
+) -> dict[str, tuple[int, list[list[int]]]]:
+    # all observations come from the single register file
+    keys = [COUNTY_CODE, REGION_CODE, FIELD_OF_CARE]
+    groups = group_rows(data, keys, frame.columns, DIMENSIONS)
+    return {observation: (0, ranges) for observation, ranges in groups.items()}
 
-def get_cube():
-    cube = create_datacube(load_data())
+
+def get_frame(
+    rollup: bool = False, modified: datetime.date | None = None
+) -> CubeFrame:
+    return create_frame(load_data(), rollup=rollup, modified=modified)
+
+
+def get_cube(rollup: bool = False, modified: datetime.date | None = None):
+    cube = get_frame(rollup, modified).to_graph()
     setattr(cube, "name", "Care providers")
     cube.bind("qb", QB)
     cube.bind("skos", SKOS)
@@ -194,15 +443,108 @@ def get_cube():
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate Care providers data cube")
+    parser.add_argument(
+        "--rollup",
+        action="store_true",
+        help="add region and whole country totals as separate datasets",
+    )
+    parser.add_argument(
+        "--modified",
+        metavar="YYYY-MM-DD",
+        help="pin dcterms:modified (defaults to SOURCE_DATE_EPOCH or today)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["ttl", "csvw"],
+        default="ttl",
+        help="csvw writes only the observations as CSV with CSVW metadata",
+    )
+    parser.add_argument(
+        "--measure",
+        action="append",
+        choices=MEASURES,
+        dest="measures",
+        help="measure to compute, repeat for more (defaults to number_of_care_providers)",
+    )
+    parser.add_argument(
+        "--lineage",
+        action="store_true",
+        help="record the source rows of every observation next to the output",
+    )
+    parser.add_argument(
+        "--partition",
+        action="store_true",
+        help="write one file per region into out/care_providers/ with a header and a manifest",
+    )
+    parser.add_argument(
+        "--region",
+        action="append",
+        dest="regions",
+        metavar="CODE",
+        help="regenerate only the partition of this region, repeat for more",
+    )
+    args = parser.parse_args()
+    args.partition = args.partition or bool(args.regions)
+    if args.format == "csvw" and (args.rollup or args.partition):
+        parser.error("--rollup and --partition are only supported for ttl output")
+    if args.partition and args.lineage:
+        parser.error("--lineage is only supported for a single output file")
+    if args.regions and args.rollup:
+        # rollup observations are numbered across all regions
+        parser.error("--region cannot be combined with --rollup")
+
     print("Generating Care providers data cube")
     data = load_data()
     print(f"Dataset size: {len(data)}")
-    cube = create_datacube(data)
-    if not os.path.exists("out"):
-        os.makedirs("out")
-    with open("out/care_providers.ttl", "wb") as file:
-        cube.serialize(file, "ttl")
-        print(f"Generated data cube into {file.name}")
+    try:
+        contracts.enforce(register=data, codelist=contracts.load_codelist())
+    except contracts.ContractError as error:
+        parser.exit(1, f"{error}\n")
+    if args.format == "csvw":
+        frame = create_frame(data, measures=args.measures)
+        metadata = write_csvw(
+            frame,
+            "out/care_providers.csv",
+            NSR.careProvidersDataCubeInstance,
+            serialize_to_string,
+        )
+        print(f"Generated observations into out/care_providers.csv ({metadata['byte_size']} bytes)")
+        if args.lineage:
+            write_lineage(
+                "out/care_providers.csv",
+                [SOURCE_CARE_PROVIDERS],
+                create_lineage(data, frame),
+            )
+        return
+
+    frame = create_frame(
+        data,
+        rollup=args.rollup,
+        modified=modification_date(args.modified),
+        measures=args.measures,
+    )
+    if args.partition:
+        if args.regions:
+            try:
+                frame = filter_regions(frame, args.regions)
+            except ValueError as error:
+                parser.error(str(error))
+        manifest = write_partitions(
+            frame.to_graph(), "out/care_providers", update=bool(args.regions)
+        )
+        print(f"Generated {len(manifest['partitions'])} partitions into out/care_providers/")
+        return
+
+    cube = frame.to_graph()
+    metadata = write_graph(cube, "out/care_providers.ttl")
+    print(f"Generated data cube into out/care_providers.ttl ({metadata['byte_size']} bytes)")
+    write_snapshot(cube, "out/care_providers.ttl")
+    if args.lineage:
+        path = write_lineage(
+            "out/care_providers.ttl", [SOURCE_CARE_PROVIDERS], create_lineage(data, frame)
+        )
+        print(f"Recorded lineage into {path}")
 
 
 if __name__ == "__main__":
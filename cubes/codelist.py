@@ -0,0 +1,138 @@
+import json
+import os
+
+import pandas as pd
+
+from cubes.sources import find_source, read_source
+
+COUNTY_CODELIST = "data/číselník-okresů-vazba-101-nadřízený.csv"
+SOURCE_CARE_PROVIDERS = "data/narodni-registr-poskytovatelu-zdravotnich-sluzeb.csv"
+CODELIST_INDEX = "out/codelist.json"
+
+# bump whenever the layout of the persisted index changes
+INDEX_VERSION = 1
+
+COUNTY = "Okres"
+COUNTY_CODE = "OkresCode"
+REGION = "Kraj"
+REGION_CODE = "KrajCode"
+
+
+class CountyIndex:
+    def __init__(self, counties: dict[str, dict], regions: dict[str, str]):
+        # NUTS county code -> {"lau": int, "label": str, "region": str}
+        self.counties = counties
+        # NUTS region code -> label
+        self.regions = regions
+        self.lau_map = {
+            county["lau"]: code
+            for code, county in counties.items()
+            if county["lau"] is not None
+        }
+
+    def county_code(self, lau: int) -> str:
+        return self.lau_map[int(lau)]
+
+    def region_code(self, county: str) -> str:
+        return self.counties[county]["region"]
+
+    def county_label(self, county: str) -> str:
+        return self.counties[county]["label"]
+
+    def region_label(self, region: str) -> str:
+        return self.regions[region]
+
+    def to_dict(self) -> dict:
+        return {"counties": self.counties, "regions": self.regions}
+
+
+def build_index(codelist: pd.DataFrame, care_providers: pd.DataFrame) -> CountyIndex:
+    registered = (
+        care_providers[[COUNTY, COUNTY_CODE, REGION, REGION_CODE]]
+        .dropna()
+        .drop_duplicates(COUNTY_CODE)
+    )
+    # NUTS -> LAU, counties missing in the codelist keep no LAU code
+    lau_codes = (
+        codelist[["CHODNOTA1", "CHODNOTA2"]]
+        .dropna()
+        .drop_duplicates("CHODNOTA1")
+        .set_index("CHODNOTA1")["CHODNOTA2"]
+    )
+
+    counties = {}
+    for row in registered.itertuples(index=False):
+        lau = lau_codes.get(row.OkresCode)
+        counties[str(row.OkresCode)] = {
+            "lau": None if lau is None else int(lau),
+            "label": str(row.Okres),
+            "region": str(row.KrajCode),
+        }
+
+    regions = {
+        str(row.KrajCode): str(row.Kraj)
+        for row in registered.drop_duplicates(REGION_CODE).itertuples(index=False)
+    }
+    return CountyIndex(counties, regions)
+
+
+def _fingerprint(path: str) -> list[int]:
+    stat = os.stat(find_source(path))
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def save_index(index: CountyIndex, sources: dict[str, list[int]], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    content = {"version": INDEX_VERSION, "sources": sources, **index.to_dict()}
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(content, file, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def read_index(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def load_index(
+    codelist_path: str = COUNTY_CODELIST,
+    care_providers_path: str = SOURCE_CARE_PROVIDERS,
+    index_path: str = CODELIST_INDEX,
+    care_providers: pd.DataFrame | None = None,
+) -> CountyIndex:
+    sources = {
+        codelist_path: _fingerprint(codelist_path),
+        care_providers_path: _fingerprint(care_providers_path),
+    }
+
+    content = read_index(index_path)
+    if (
+        content is not None
+        and content.get("version") == INDEX_VERSION
+        and content.get("sources") == sources
+    ):
+        return CountyIndex(content["counties"], content["regions"])
+
+    # the index is missing or stale, rebuild it from the sources
+    codelist = read_source(codelist_path)
+    if care_providers is None:
+        care_providers = read_source(
+            care_providers_path,
+            usecols=[COUNTY, COUNTY_CODE, REGION, REGION_CODE],
+            low_memory=False,
+        )
+    index = build_index(codelist, care_providers)
+    save_index(index, sources, index_path)
+    return index
+
+
+def main():
+    index = load_index()
+    print(f"Code list index: {len(index.counties)} counties, {len(index.regions)} regions")
+    print(f"Stored in {CODELIST_INDEX}")
+
+
+if __name__ == "__main__":
+    main()
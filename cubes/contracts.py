@@ -0,0 +1,176 @@
+import argparse
+import sys
+
+import pandas as pd
+from pandas.api.types import is_integer_dtype, is_string_dtype
+
+import cubes.population
+from cubes.codelist import COUNTY_CODELIST, SOURCE_CARE_PROVIDERS
+from cubes.sources import read_source
+
+# column -> (dtype check of the present values, maximal share of missing values),
+# incomplete register rows are dropped while grouping, like the Airflow cleaning does
+REGISTER = {
+    "OkresCode": (is_string_dtype, 0.05),
+    "Okres": (is_string_dtype, 0.05),
+    "KrajCode": (is_string_dtype, 0.05),
+    "Kraj": (is_string_dtype, 0.05),
+    "OborPece": (is_string_dtype, 0.05),
+    "Ico": (is_integer_dtype, 0.05),
+    "DruhZarizeni": (is_string_dtype, 0.05),
+    "PravniFormaKod": (is_integer_dtype, 0.05),
+}
+# checked after the mean population of counties is filtered out
+POPULATION = {
+    "hodnota": (is_integer_dtype, 0.0),
+    "rok": (is_integer_dtype, 0.0),
+    "vuzemi_kod": (is_integer_dtype, 0.0),
+    "vuzemi_txt": (is_string_dtype, 0.0),
+}
+CODELIST = {
+    "CHODNOTA1": (is_string_dtype, 0.0),
+    "CHODNOTA2": (is_integer_dtype, 0.0),
+}
+
+
+class ContractError(ValueError):
+    def __init__(self, problems: list[str]):
+        self.problems = problems
+        super().__init__("\n".join(["Source data breaks its contract:", *problems]))
+
+
+def check_columns(name: str, data: pd.DataFrame, contract: dict) -> list[str]:
+    missing = [column for column in contract if column not in data.columns]
+    problems = [f"{name}: missing column {column}" for column in missing]
+
+    columns = [column for column in contract if column not in missing]
+    null_rates = data[columns].isna().mean()
+    for column in columns:
+        check, max_null_rate = contract[column]
+        # missing values turn integer columns into floats, only the rest is checked
+        dtype = data[column].dropna().convert_dtypes().dtype
+        if null_rates[column] < 1 and not check(dtype):
+            problems.append(
+                f"{name}: column {column} has dtype {dtype}, "
+                f"expected {check.__name__.removeprefix('is_').removesuffix('_dtype')}"
+            )
+        if null_rates[column] > max_null_rate:
+            problems.append(
+                f"{name}: column {column} is {null_rates[column]:.2%} empty, "
+                f"at most {max_null_rate:.2%} allowed"
+            )
+    return problems
+
+
+def _sample(values) -> str:
+    values = sorted(str(value) for value in values)
+    more = f" and {len(values) - 5} more" if len(values) > 5 else ""
+    return ", ".join(values[:5]) + more
+
+
+def check_register(register: pd.DataFrame) -> list[str]:
+    # the county -> region hierarchy has to be a function
+    regions = register.groupby("OkresCode")["KrajCode"].nunique()
+    ambiguous = regions.index[regions > 1]
+    if len(ambiguous):
+        return [f"register: counties in several regions: {_sample(ambiguous)}"]
+    return []
+
+
+def check_references(
+    register: pd.DataFrame | None,
+    population: pd.DataFrame | None,
+    codelist: pd.DataFrame,
+) -> list[str]:
+    problems = []
+    lau_codes = codelist.dropna(subset=["CHODNOTA1", "CHODNOTA2"])
+
+    if population is not None:
+        # population counties are LAU codes translated by the code list
+        unknown = ~population["vuzemi_kod"].isin(lau_codes["CHODNOTA2"])
+        if unknown.any():
+            problems.append(
+                "population: LAU codes missing in the code list: "
+                + _sample(population.loc[unknown, "vuzemi_kod"].unique())
+            )
+
+    if register is not None and population is not None:
+        # the region of a county is only known from the register
+        used = lau_codes["CHODNOTA2"].isin(population["vuzemi_kod"])
+        counties = lau_codes.loc[used, "CHODNOTA1"]
+        unknown = ~counties.isin(register["OkresCode"])
+        if unknown.any():
+            problems.append(
+                "code list: counties with population but no region in the register: "
+                + _sample(counties[unknown].unique())
+            )
+
+    if register is not None:
+        # the hierarchy and the population cube need the LAU code of every county
+        registered = register["OkresCode"].dropna().drop_duplicates()
+        unmapped = registered[~registered.isin(lau_codes["CHODNOTA1"])]
+        if len(unmapped):
+            problems.append(
+                "register: counties missing in the code list: " + _sample(unmapped)
+            )
+    return problems
+
+
+def check_sources(
+    register: pd.DataFrame | None = None,
+    population: pd.DataFrame | None = None,
+    codelist: pd.DataFrame | None = None,
+) -> list[str]:
+    problems = []
+    if register is not None:
+        problems += check_columns("register", register, REGISTER)
+    if population is not None:
+        problems += check_columns("population", population, POPULATION)
+    if codelist is not None:
+        problems += check_columns("code list", codelist, CODELIST)
+    # references are only meaningful between well formed sources
+    if problems:
+        return problems
+
+    if register is not None:
+        problems += check_register(register)
+    if codelist is not None:
+        problems += check_references(register, population, codelist)
+    return problems
+
+
+def enforce(
+    register: pd.DataFrame | None = None,
+    population: pd.DataFrame | None = None,
+    codelist: pd.DataFrame | None = None,
+) -> None:
+    problems = check_sources(register, population, codelist)
+    if problems:
+        raise ContractError(problems)
+
+
+def load_codelist(path: str = COUNTY_CODELIST) -> pd.DataFrame:
+    return read_source(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the sources before building")
+    parser.add_argument("--register", default=SOURCE_CARE_PROVIDERS)
+    parser.add_argument("--codelist", default=COUNTY_CODELIST)
+    parser.add_argument("population", nargs="*", help="yearly population files")
+    args = parser.parse_args()
+
+    problems = check_sources(
+        read_source(args.register, low_memory=False),
+        cubes.population.load_data(args.population or None),
+        load_codelist(args.codelist),
+    )
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print("All source contracts hold")
+
+
+if __name__ == "__main__":
+    main()
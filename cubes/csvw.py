@@ -0,0 +1,99 @@
+import json
+import os
+from typing import Callable
+
+import pandas as pd
+from rdflib import Namespace, URIRef
+
+from cubes.distribution import write_file
+from cubes.frame import CubeFrame
+
+NS = Namespace("https://milan252525.github.io/ontology#")
+NSR = Namespace("https://milan252525.github.io/resources/")
+
+CSVW_CONTEXT = "http://www.w3.org/ns/csvw"
+METADATA_SUFFIX = "-metadata.json"
+
+DATATYPES = {"i": "integer", "u": "nonNegativeInteger", "f": "double", "b": "boolean"}
+
+
+def csvw_metadata_path(path: str) -> str:
+    # the location CSVW processors look for when given only the CSV
+    return path + METADATA_SUFFIX
+
+
+def create_table(
+    frame: CubeFrame,
+    serialize: Callable[[str], str] = str,
+    namespaces: dict[str, Namespace] | None = None,
+) -> pd.DataFrame:
+    namespaces = namespaces or {}
+    columns = frame.columns
+    table = pd.DataFrame(
+        {"observation": "observation-" + columns.index.astype(str).str.zfill(4)},
+        index=columns.index,
+    )
+    # codes are written as the IRIs of their resources, minted like in the Turtle cube
+    for dimension in frame.dimensions:
+        namespace = namespaces.get(dimension, NSR)
+        table[dimension] = columns[dimension].map(
+            lambda code: str(namespace[serialize(code)])
+        )
+    for measure in frame.measures:
+        table[measure] = columns[measure]
+    return table
+
+
+def create_metadata(table: pd.DataFrame, frame: CubeFrame, url: str, dataset: URIRef) -> dict:
+    columns = [{"name": "observation", "titles": "observation", "suppressOutput": True}]
+    for dimension in frame.dimensions:
+        columns.append(
+            {
+                "name": dimension,
+                "titles": dimension,
+                "propertyUrl": str(NS[dimension]),
+                # the cell already holds the absolute IRI, reserved expansion keeps
+                # its ":", "/" and ","
+                "valueUrl": "{+" + dimension + "}",
+            }
+        )
+    for measure in frame.measures:
+        columns.append(
+            {
+                "name": measure,
+                "titles": measure,
+                "propertyUrl": str(NS[measure]),
+                "datatype": DATATYPES.get(table[measure].dtype.kind, "string"),
+            }
+        )
+    # constant triples of every observation
+    columns.append({"virtual": True, "propertyUrl": "rdf:type", "valueUrl": "qb:Observation"})
+    columns.append({"virtual": True, "propertyUrl": "qb:dataSet", "valueUrl": str(dataset)})
+
+    return {
+        "@context": CSVW_CONTEXT,
+        "url": url,
+        "tableSchema": {
+            "columns": columns,
+            "primaryKey": "observation",
+            "aboutUrl": str(NSR) + "{observation}",
+        },
+    }
+
+
+def write_csvw(
+    frame: CubeFrame,
+    path: str,
+    dataset: URIRef,
+    serialize: Callable[[str], str] = str,
+    namespaces: dict[str, Namespace] | None = None,
+) -> dict:
+    # codes of the dimensions missing in namespaces are resources of NSR
+    table = create_table(frame, serialize, namespaces)
+    data = table.to_csv(index=False, lineterminator="\n").encode("utf-8")
+    metadata = write_file(path, "csv", lambda writer: writer.write(data))
+
+    description = create_metadata(table, frame, os.path.basename(path), dataset)
+    with open(csvw_metadata_path(path), "w", encoding="utf-8") as file:
+        json.dump(description, file, indent=1, ensure_ascii=False)
+    return metadata
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from typing import BinaryIO, Callable
+
+from rdflib import Graph
+
+METADATA_SUFFIX = ".meta.json"
+
+MEDIA_TYPES = {
+    "ttl": "text/turtle",
+    "turtle": "text/turtle",
+    "nt": "application/n-triples",
+    "trig": "application/trig",
+    "xml": "application/rdf+xml",
+    "json-ld": "application/ld+json",
+    "csv": "text/csv",
+}
+
+
+class DigestWriter:
+    # passes writes through to the file while hashing and counting the bytes
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.byte_size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.byte_size += len(data)
+        return self.file.write(data)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def metadata_path(path: str) -> str:
+    return path + METADATA_SUFFIX
+
+
+def write_file(path: str, format: str, write: Callable[[DigestWriter], None]) -> dict:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as file:
+        writer = DigestWriter(file)
+        write(writer)
+
+    metadata = {
+        "file": os.path.basename(path),
+        "format": format,
+        "media_type": MEDIA_TYPES.get(format, "application/octet-stream"),
+        "byte_size": writer.byte_size,
+        "sha256": writer.sha256.hexdigest(),
+    }
+    with open(metadata_path(path), "w", encoding="utf-8") as file:
+        json.dump(metadata, file, indent=1, sort_keys=True)
+    return metadata
+
+
+def write_graph(graph: Graph, path: str, format: str = "ttl") -> dict:
+    return write_file(path, format, lambda writer: graph.serialize(writer, format))
+
+
+def read_metadata(path: str) -> dict | None:
+    try:
+        with open(metadata_path(path), encoding="utf-8") as file:
+            metadata = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    # metadata of an older file than the one on disk is useless
+    if not os.path.exists(path) or os.path.getsize(path) != metadata["byte_size"]:
+        return None
+    return metadata
@@ -0,0 +1,76 @@
+from typing import Callable
+
+import pandas as pd
+from rdflib import Graph
+
+
+class CubeFrame:
+    def __init__(
+        self,
+        columns: pd.DataFrame,
+        dimensions: list[str],
+        measures: list[str],
+        materialize: Callable[[pd.DataFrame], Graph] | None = None,
+        additive: list[str] | None = None,
+    ):
+        # one row per observation, dimension codes are categorical
+        self.columns = columns.astype({dimension: "category" for dimension in dimensions})
+        self.dimensions = dimensions
+        self.measures = measures
+        # measures that can be summed over a dimension, all of them by default
+        self.additive = measures if additive is None else additive
+        self._materialize = materialize
+        self._graph = None
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __repr__(self) -> str:
+        return (
+            f"CubeFrame({len(self)} observations, "
+            f"dimensions={self.dimensions}, measures={self.measures})"
+        )
+
+    def _derive(
+        self, columns: pd.DataFrame, dimensions: list[str], measures: list[str] | None = None
+    ) -> "CubeFrame":
+        # triples can only be built for the original set of dimensions and measures
+        measures = self.measures if measures is None else measures
+        same = dimensions == self.dimensions and measures == self.measures
+        materialize = self._materialize if same else None
+        additive = [measure for measure in self.additive if measure in measures]
+        return CubeFrame(columns, dimensions, measures, materialize, additive)
+
+    def filter(self, **conditions: str | list[str]) -> "CubeFrame":
+        mask = pd.Series(True, index=self.columns.index)
+        for dimension, value in conditions.items():
+            if dimension not in self.dimensions:
+                raise KeyError(f"Unknown dimension {dimension}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= self.columns[dimension].isin(values)
+        return self._derive(self.columns[mask], self.dimensions)
+
+    def groupby(self, dimensions: str | list[str], measures: list[str] | None = None):
+        measures = self.measures if measures is None else measures
+        return self.columns.groupby(dimensions, observed=True)[measures]
+
+    def rollup(self, dimensions: list[str], agg: str = "sum") -> "CubeFrame":
+        for dimension in dimensions:
+            if dimension not in self.dimensions:
+                raise KeyError(f"Unknown dimension {dimension}")
+        # summing distinct counts or rates gives wrong totals, those are dropped
+        measures = self.additive if agg == "sum" else self.measures
+        if not measures:
+            raise ValueError(f"No measure of {self} can be rolled up with {agg}")
+        columns = self.groupby(dimensions, measures).agg(agg).reset_index()
+        return self._derive(columns, dimensions, measures)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self.columns.copy()
+
+    def to_graph(self) -> Graph:
+        if self._materialize is None:
+            raise ValueError("Triples are not available for a rolled up CubeFrame")
+        if self._graph is None:
+            self._graph = self._materialize(self.columns)
+        return self._graph
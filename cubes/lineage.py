@@ -0,0 +1,126 @@
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from cubes.sources import find_source, open_source, read_source
+
+LINEAGE_SUFFIX = ".lineage.json"
+# bump whenever the layout of the sidecar changes
+LINEAGE_VERSION = 1
+CHUNK_SIZE = 1 << 20
+
+
+def lineage_path(path: str) -> str:
+    return path + LINEAGE_SUFFIX
+
+
+def source_digest(path: str) -> str:
+    # digest of the decompressed content, a recompressed source keeps its rows
+    sha256 = hashlib.sha256()
+    with open_source(path) as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def encode_rows(rows) -> list[list[int]]:
+    # consecutive row numbers collapse into inclusive [first, last] ranges
+    ranges = []
+    for row in sorted(int(row) for row in rows):
+        if ranges and ranges[-1][1] + 1 == row:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ranges
+
+
+def decode_rows(ranges: list[list[int]]) -> list[int]:
+    return [row for first, last in ranges for row in range(first, last + 1)]
+
+
+def group_rows(
+    data: pd.DataFrame, keys: list[str], columns: pd.DataFrame, dimensions: list[str]
+) -> dict[str, list[list[int]]]:
+    # positions of the grouped rows are their row numbers in the source file
+    observations = {
+        tuple(values): "observation-" + str(index).zfill(4)
+        for index, values in zip(
+            columns.index, columns[dimensions].itertuples(index=False)
+        )
+    }
+    return {
+        observations[group]: encode_rows(positions)
+        for group, positions in data.groupby(keys).indices.items()
+        if group in observations
+    }
+
+
+def write_lineage(
+    path: str, sources: list[str], observations: dict[str, tuple[int, list[list[int]]]]
+) -> str:
+    # observation -> [index of the source, row ranges]
+    content = {
+        "version": LINEAGE_VERSION,
+        "sources": [
+            {"path": find_source(source), "sha256": source_digest(source)}
+            for source in sources
+        ],
+        "observations": {
+            name: [source, ranges] for name, (source, ranges) in sorted(observations.items())
+        },
+    }
+    target = lineage_path(path)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    with open(target + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(content, file, separators=(",", ":"))
+    os.replace(target + ".tmp", target)
+    return target
+
+
+def read_lineage(path: str) -> dict | None:
+    try:
+        with open(lineage_path(path), encoding="utf-8") as file:
+            content = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if content.get("version") != LINEAGE_VERSION:
+        return None
+    return content
+
+
+def source_rows(path: str, observation: str) -> tuple[dict, list[int]]:
+    content = read_lineage(path)
+    if content is None:
+        raise FileNotFoundError(f"No lineage recorded for {path}")
+    if observation not in content["observations"]:
+        raise KeyError(f"Unknown observation {observation}")
+    source, ranges = content["observations"][observation]
+    return content["sources"][source], decode_rows(ranges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the source rows of an observation")
+    parser.add_argument("cube", help="generated cube, e.g. out/care_providers.ttl")
+    parser.add_argument("observation", help="local name, e.g. observation-0001")
+    parser.add_argument(
+        "--show", action="store_true", help="print the rows instead of their numbers"
+    )
+    args = parser.parse_args()
+
+    source, rows = source_rows(args.cube, args.observation)
+    print(f"{source['path']} (sha256 {source['sha256']})")
+    if not args.show:
+        print(" ".join(str(row) for row in rows))
+        return
+
+    if source_digest(source["path"]) != source["sha256"]:
+        print("warning: the source changed since the cube was built")
+    data = read_source(source["path"], low_memory=False)
+    print(data.iloc[rows].to_csv())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import json
+import os
+
+from rdflib import Graph, Namespace
+from rdflib.namespace import QB, RDF
+
+from cubes.canonical import local_name
+from cubes.distribution import metadata_path, write_graph
+from cubes.frame import CubeFrame
+
+NS = Namespace("https://milan252525.github.io/ontology#")
+
+HEADER = "header.ttl"
+MANIFEST = "manifest.json"
+# bump whenever the layout of the manifest changes
+MANIFEST_VERSION = 2
+
+
+def filter_regions(frame: CubeFrame, regions: list[str]) -> CubeFrame:
+    # codes are matched regardless of case, like in read_partitions
+    regions = [region.upper() for region in regions]
+    unknown = sorted(set(regions) - set(frame.columns["region"].astype(str).str.upper()))
+    if unknown:
+        raise ValueError(f"No partition for region {', '.join(unknown)}")
+    return frame.filter(region=regions)
+
+
+def split_graph(cube: Graph) -> tuple[Graph, dict[str, Graph]]:
+    # observations go to the partition of their region, everything else to the header
+    # care providers resources have lowercase local names, files are named by the code
+    regions = {
+        observation: local_name(region).upper()
+        for observation, region in cube.subject_objects(NS.region)
+        if (observation, RDF.type, QB.Observation) in cube
+    }
+
+    def create() -> Graph:
+        graph = Graph()
+        for prefix, namespace in cube.namespaces():
+            graph.bind(prefix, namespace, override=True)
+        return graph
+
+    header = create()
+    partitions = {}
+    for triple in cube:
+        subject, predicate, value = triple
+        region = regions.get(subject)
+        # slice membership follows the observation
+        if region is None and predicate == QB.observation:
+            region = regions.get(value)
+        if region is None:
+            header.add(triple)
+            continue
+        if region not in partitions:
+            partitions[region] = create()
+        partitions[region].add(triple)
+    return header, partitions
+
+
+def _describe(graph: Graph, path: str) -> dict:
+    metadata = write_graph(graph, path)
+    return {
+        "file": metadata["file"],
+        "triples": len(graph),
+        "byte_size": metadata["byte_size"],
+        "sha256": metadata["sha256"],
+    }
+
+
+def read_manifest(directory: str) -> dict | None:
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_partitions(cube: Graph, directory: str, update: bool = False) -> dict:
+    # an update replaces the partitions found in the cube and keeps the rest
+    header, partitions = split_graph(cube)
+    manifest = read_manifest(directory)
+
+    if not update:
+        previous = manifest["partitions"] if manifest else {}
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "header": _describe(header, os.path.join(directory, HEADER)),
+            "partitions": {},
+        }
+        # files of regions that disappeared from the data are removed
+        for region, entry in previous.items():
+            if region not in partitions:
+                path = os.path.join(directory, entry["file"])
+                for stale in (path, metadata_path(path)):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+    elif manifest is None:
+        raise FileNotFoundError(f"No manifest in {directory}, write all partitions first")
+
+    for region, graph in sorted(partitions.items()):
+        path = os.path.join(directory, region + ".ttl")
+        manifest["partitions"][region] = _describe(graph, path)
+
+    target = os.path.join(directory, MANIFEST)
+    with open(target + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(target + ".tmp", target)
+    return manifest
+
+
+def read_partitions(directory: str, regions: list[str] | None = None) -> Graph:
+    # the header with the partitions of the requested regions, all by default
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No manifest in {directory}")
+
+    if regions is not None:
+        regions = [region.upper() for region in regions]
+    graph = Graph()
+    graph.parse(os.path.join(directory, manifest["header"]["file"]), format="ttl")
+    for region, entry in manifest["partitions"].items():
+        if regions is None or region in regions:
+            graph.parse(os.path.join(directory, entry["file"]), format="ttl")
+    return graph
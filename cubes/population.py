@@ -1,17 +1,33 @@
+import argparse
 import datetime
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
-from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DCTERMS, QB, RDF, SKOS, XSD
 
-SOURCE_POPULATION = "data/130141-22data2021.csv"
-SOURCE_CARE_PROVIDERS = "data/narodni-registr-poskytovatelu-zdravotnich-sluzeb.csv"
-COUNTY_CODELIST = "data/číselník-okresů-vazba-101-nadřízený.csv"
+from cubes import care_providers, contracts
+from cubes.canonical import modification_date, stable_bnode
+from cubes.codelist import CountyIndex, load_index
+from cubes.csvw import write_csvw
+from cubes.distribution import write_graph
+from cubes.frame import CubeFrame
+from cubes.lineage import encode_rows, write_lineage
+from cubes.partitions import filter_regions, write_partitions
+from cubes.snapshot import write_snapshot
+from cubes.sources import read_source
+from cubes.store import create_graph
+
+# one CZSO file per year, all of them end up in a single cube
+SOURCES_POPULATION = ["data/130141-22data2021.csv"]
 
 NS = Namespace("https://milan252525.github.io/ontology#")
 NSR = Namespace("https://milan252525.github.io/resources/")
 RDFS = Namespace("http://www.w3.org/2000/01/rdf-schema#")
+# reference periods are the calendar years of the UK reference intervals
+INTERVAL = Namespace("http://reference.data.gov.uk/def/intervals/")
+YEAR = Namespace("http://reference.data.gov.uk/id/year/")
 
 SDMX_DIM = Namespace("http://purl.org/linked-data/sdmx/2009/dimension#")
 SDMX_CON = Namespace("http://purl.org/linked-data/sdmx/2009/concept#")
@@ -20,31 +36,88 @@ SDMX_MES = Namespace("http://purl.org/linked-data/sdmx/2009/measure#")
 COUNTY = "Okres"
 REGION = "Kraj"
 
+# column names of the CubeFrame, same as the local names of the properties
+DIMENSIONS = ["county", "region", "ref_period"]
+MEASURES = ["mean_population"]
 
-def load_data() -> pd.DataFrame:
-    return pd.read_csv(SOURCE_POPULATION)
 
+def load_year(path: str) -> pd.DataFrame:
+    data = read_source(path)
+    # filtered in the worker, only a few rows per year are sent back
+    data = data[(data["vuk"] == "DEM0004") & (data["vuzemi_cis"] == 101)]
+    # kept for the lineage of the observations
+    return data.assign(source=path, source_row=data.index)
+
+
+def load_data(paths: list[str] | None = None) -> pd.DataFrame:
+    paths = paths or SOURCES_POPULATION
+    if len(paths) == 1:
+        return load_year(paths[0])
+
+    # every year is parsed and filtered in its own process
+    with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as executor:
+        data = pd.concat(executor.map(load_year, paths))
+    # row numbers repeat in every file, the year keeps observations apart,
+    # a single year keeps the plain row numbers
+    data.index = data["rok"].astype(str) + "-" + data.index.astype(str).str.zfill(4)
+    return data
+
+
+def load_codelist() -> CountyIndex:
+    return load_index()
+
+
+def create_frame(
+    data: pd.DataFrame,
+    codelist: CountyIndex,
+    modified: datetime.date | None = None,
+) -> CubeFrame:
+    # data from load_data, already only mean population in counties
+    counties = data["vuzemi_kod"].map(codelist.county_code)
+    columns = pd.DataFrame(
+        {
+            "county": counties,
+            "region": counties.map(codelist.region_code),
+            "ref_period": data["rok"].astype(str),
+            "mean_population": data["hodnota"].astype("int64"),
+        },
+        index=data.index,
+    )
+    labels = dict(zip(counties, data["vuzemi_txt"]))
 
-def load_care_providers() -> pd.DataFrame:
-    return pd.read_csv(SOURCE_CARE_PROVIDERS, low_memory=False)
+    return CubeFrame(
+        columns,
+        DIMENSIONS,
+        MEASURES,
+        lambda columns: build_datacube(columns, labels, codelist, modified),
+    )
 
 
-def load_codelist() -> pd.DataFrame:
-    return pd.read_csv(COUNTY_CODELIST)
+def create_datacube(
+    data: pd.DataFrame,
+    codelist: CountyIndex,
+    modified: datetime.date | None = None,
+) -> Graph:
+    return create_frame(data, codelist, modified).to_graph()
 
 
-def create_datacube(data: pd.DataFrame, codelist: pd.DataFrame) -> Graph:
-    cube = Graph()
+def build_datacube(
+    columns: pd.DataFrame,
+    labels: dict[str, str],
+    codelist: CountyIndex,
+    modified: datetime.date | None = None,
+) -> Graph:
+    cube = create_graph()
     dimensions = add_dimensions(cube)
     measures = add_measures(cube)
     structure = create_structure(cube, dimensions, measures)
-    dataset = create_dataset(cube, structure)
-
-    # filter only mean population in counties
-    data = data[(data["vuk"] == "DEM0004") & (data["vuzemi_cis"] == 101)]
+    slice_keys = add_slice_keys(cube, structure)
+    years = sorted(columns["ref_period"].unique())
+    dataset = create_dataset(cube, structure, modified, years)
 
-    create_resources(cube, data, codelist)
-    create_observations(cube, dataset, data, codelist)
+    create_resources(cube, columns, labels, codelist)
+    members = create_observations(cube, dataset, columns)
+    care_providers.create_slices(cube, dataset, slice_keys, members)
 
     return cube
 
@@ -76,7 +149,20 @@ def add_dimensions(cube: Graph) -> list[URIRef]:
     for prop in properties:
         cube.add((region, *prop))
 
-    return [county, region]
+    ref_period = NS.ref_period
+    properties = [
+        (RDF.type, RDFS.Property),
+        (RDF.type, QB.DimensionProperty),
+        (RDFS.label, Literal("Referenční období", lang="cs")),
+        (RDFS.label, Literal("Reference period", lang="en")),
+        (RDFS.range, INTERVAL.Interval),
+        (RDFS.subPropertyOf, SDMX_DIM.refPeriod),
+        (QB.concept, SDMX_CON.refPeriod),
+    ]
+    for prop in properties:
+        cube.add((ref_period, *prop))
+
+    return [county, region, ref_period]
 
 
 def add_measures(cube: Graph) -> list[URIRef]:
@@ -103,27 +189,49 @@ def create_structure(
     cube.add((structure, RDF.type, QB.DataStructureDefinition))
 
     for dimension in dimensions:
-        component = BNode()
+        component = stable_bnode(structure, dimension)
         cube.add((structure, QB.component, component))
         cube.add((component, QB.dimension, dimension))
 
     for measure in measures:
-        component = BNode()
+        component = stable_bnode(structure, measure)
         cube.add((structure, QB.component, component))
         cube.add((component, QB.measure, measure))
 
     return structure
 
 
-def create_dataset(cube: Graph, structure: URIRef) -> URIRef:
+def add_slice_keys(cube: Graph, structure: URIRef) -> dict[URIRef, URIRef]:
+    slice_key = NS.sliceByRegion
+    cube.add((slice_key, RDF.type, QB.SliceKey))
+    cube.add((slice_key, RDFS.label, Literal("Slice by region", lang="en")))
+    cube.add((slice_key, RDFS.label, Literal("Řez podle kraje", lang="cs")))
+    cube.add((slice_key, QB.componentProperty, NS.region))
+    cube.add((structure, QB.sliceKey, slice_key))
+
+    return {NS.region: slice_key}
+
+
+def period_label(years: list[str]) -> str:
+    return years[0] if len(years) == 1 else f"{years[0]}–{years[-1]}"
+
+
+def create_dataset(
+    cube: Graph,
+    structure: URIRef,
+    modified: datetime.date | None = None,
+    years: list[str] | None = None,
+) -> URIRef:
+    period = period_label(years or ["2021"])
+
     dataset = NSR.populationDataCubeInstance
     cube.add((dataset, RDF.type, QB.DataSet))
-    cube.add((dataset, RDFS.label, Literal("Population 2021", lang="en")))
-    cube.add((dataset, RDFS.label, Literal("Obyvatelé v okresech 2021", lang="cs")))
+    cube.add((dataset, RDFS.label, Literal(f"Population {period}", lang="en")))
+    cube.add((dataset, RDFS.label, Literal(f"Obyvatelé v okresech {period}", lang="cs")))
     cube.add((dataset, QB.structure, structure))
 
     issued = datetime.date(2023, 3, 12)
-    curr_date = datetime.date.today().isoformat()
+    curr_date = (modified or modification_date()).isoformat()
     cube.add((dataset, DCTERMS.issued, Literal(issued, datatype=XSD.date)))
     cube.add((dataset, DCTERMS.modified, Literal(curr_date, datatype=XSD.date)))
 
@@ -139,65 +247,154 @@ def create_dataset(cube: Graph, structure: URIRef) -> URIRef:
     return dataset
 
 
-def translate_county_code_name(code: int, codelist: pd.DataFrame) -> str:
-    return codelist[(codelist["CHODNOTA2"] == code)].iloc[0]["CHODNOTA1"]
-
-
-def create_resources(cube: Graph, data: pd.DataFrame, codelist: pd.DataFrame) -> None:
-    for _, row in data.iterrows():
-        code = translate_county_code_name(row.vuzemi_kod, codelist)
-        cube.add((NSR[code], SKOS.prefLabel, Literal(row.vuzemi_txt, lang="cs")))
+def create_resources(
+    cube: Graph, columns: pd.DataFrame, labels: dict[str, str], codelist: CountyIndex
+) -> None:
+    for code in columns["county"].unique():
+        cube.add((NSR[code], SKOS.prefLabel, Literal(labels[code], lang="cs")))
 
-    regions = load_care_providers()
-    for _, row in regions[["KrajCode", "Kraj"]].drop_duplicates().dropna().iterrows():
-        region = row["KrajCode"]
-        cube.add((NSR[region], SKOS.prefLabel, Literal(row["Kraj"], lang="cs")))
+    for region, label in codelist.regions.items():
+        cube.add((NSR[region], SKOS.prefLabel, Literal(label, lang="cs")))
 
 
 def create_observations(
-    cube: Graph, dataset: URIRef, data: pd.DataFrame, codelist: pd.DataFrame
-) -> None:
-    regions = load_care_providers()
-    code_map = {}
-    for _, row in (
-        regions[["KrajCode", "OkresCode"]].drop_duplicates().dropna().iterrows()
-    ):
-        code_map[row["OkresCode"]] = row["KrajCode"]
-
-    for index, row in data.iterrows():
+    cube: Graph, dataset: URIRef, columns: pd.DataFrame
+) -> dict[tuple[URIRef, URIRef], list[URIRef]]:
+    # observations grouped by (dimension, value), used to build the slices
+    members = {}
+
+    rows = columns[DIMENSIONS + MEASURES].itertuples(index=False)
+    for index, (county, region, year, population) in zip(columns.index, rows):
         resource = NSR["observation-" + str(index).zfill(4)]
         cube.add((resource, RDF.type, QB.Observation))
         cube.add((resource, QB.dataSet, dataset))
         cube.add((resource, QB.dataSet, dataset))
 
-        county = translate_county_code_name(row.vuzemi_kod, codelist)
+        region = NSR[region]
         cube.add((resource, NS.county, NSR[county]))
-        cube.add((resource, NS.region, NSR[code_map[county]]))
+        cube.add((resource, NS.region, region))
+        cube.add((resource, NS.ref_period, YEAR[year]))
 
         cube.add(
-            (resource, NS.mean_population, Literal(row.hodnota, datatype=XSD.integer))
+            (resource, NS.mean_population, Literal(int(population), datatype=XSD.integer))
         )
 
+        members.setdefault((NS.region, region), []).append(resource)
+
+    return members
+
+
+def create_lineage(
+    data: pd.DataFrame, sources: list[str]
+) -> dict[str, tuple[int, list[list[int]]]]:
+    # every observation comes from a single row of its yearly file
+    positions = {source: position for position, source in enumerate(sources)}
+    return {
+        "observation-" + str(index).zfill(4): (positions[source], encode_rows([row]))
+        for index, source, row in zip(data.index, data["source"], data["source_row"])
+    }
+
+
+def get_frame(
+    modified: datetime.date | None = None, paths: list[str] | None = None
+) -> CubeFrame:
+    return create_frame(load_data(paths), load_codelist(), modified)
+
 
-def get_cube():
-    cube = create_datacube(load_data(), load_codelist())
-    setattr(cube, "name", "Population 2021")
+def get_cube(modified: datetime.date | None = None, paths: list[str] | None = None):
+    cube = get_frame(modified, paths).to_graph()
+    setattr(cube, "name", "Population")
     cube.bind("qb", QB)
     cube.bind("skos", SKOS)
     return cube
 
 
 def main():
-    print("Generating Population 2021 data cube")
-    data = load_data()
+    parser = argparse.ArgumentParser(description="Generate Population data cube")
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        default=SOURCES_POPULATION,
+        help="yearly CZSO population files (defaults to 2021 only)",
+    )
+    parser.add_argument(
+        "--modified",
+        metavar="YYYY-MM-DD",
+        help="pin dcterms:modified (defaults to SOURCE_DATE_EPOCH or today)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["ttl", "csvw"],
+        default="ttl",
+        help="csvw writes only the observations as CSV with CSVW metadata",
+    )
+    parser.add_argument(
+        "--lineage",
+        action="store_true",
+        help="record the source rows of every observation next to the output",
+    )
+    parser.add_argument(
+        "--partition",
+        action="store_true",
+        help="write one file per region into out/population/ with a header and a manifest",
+    )
+    parser.add_argument(
+        "--region",
+        action="append",
+        dest="regions",
+        metavar="CODE",
+        help="regenerate only the partition of this region, repeat for more",
+    )
+    args = parser.parse_args()
+    args.partition = args.partition or bool(args.regions)
+    if args.format == "csvw" and args.partition:
+        parser.error("--partition is only supported for ttl output")
+    if args.partition and args.lineage:
+        parser.error("--lineage is only supported for a single output file")
+
+    print("Generating Population data cube")
+    data = load_data(args.sources)
+    try:
+        contracts.enforce(population=data, codelist=contracts.load_codelist())
+    except contracts.ContractError as error:
+        parser.exit(1, f"{error}\n")
     codelist = load_codelist()
     print(f"Dataset size: {len(data)}")
-    cube = create_datacube(data, codelist)
-    if not os.path.exists("out"):
-        os.makedirs("out")
-    with open("out/population.ttl", "wb") as file:
-        cube.serialize(file, "ttl")
-        print(f"Generated data cube into {file.name}")
+    if args.format == "csvw":
+        frame = create_frame(data, codelist)
+        metadata = write_csvw(
+            frame,
+            "out/population.csv",
+            NSR.populationDataCubeInstance,
+            namespaces={"ref_period": YEAR},
+        )
+        print(f"Generated observations into out/population.csv ({metadata['byte_size']} bytes)")
+        if args.lineage:
+            write_lineage("out/population.csv", args.sources, create_lineage(data, args.sources))
+        return
+
+    if args.partition:
+        frame = create_frame(data, codelist, modification_date(args.modified))
+        if args.regions:
+            try:
+                frame = filter_regions(frame, args.regions)
+            except ValueError as error:
+                parser.error(str(error))
+        manifest = write_partitions(
+            frame.to_graph(), "out/population", update=bool(args.regions)
+        )
+        print(f"Generated {len(manifest['partitions'])} partitions into out/population/")
+        return
+
+    cube = create_datacube(data, codelist, modification_date(args.modified))
+    metadata = write_graph(cube, "out/population.ttl")
+    print(f"Generated data cube into out/population.ttl ({metadata['byte_size']} bytes)")
+    write_snapshot(cube, "out/population.ttl")
+    if args.lineage:
+        path = write_lineage(
+            "out/population.ttl", args.sources, create_lineage(data, args.sources)
+        )
+        print(f"Recorded lineage into {path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+import argparse
+import datetime
+from decimal import Decimal
+
+import pandas as pd
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import QB, RDF, SKOS, XSD
+
+from cubes import care_providers, contracts, population
+from cubes.canonical import modification_date
+from cubes.codelist import CountyIndex, load_index
+from cubes.distribution import write_graph
+from cubes.frame import CubeFrame
+from cubes.snapshot import write_snapshot
+from cubes.store import create_graph
+
+NS = Namespace("https://milan252525.github.io/ontology#")
+NSR = Namespace("https://milan252525.github.io/resources/")
+RDFS = Namespace("http://www.w3.org/2000/01/rdf-schema#")
+
+SDMX_MES = Namespace("http://purl.org/linked-data/sdmx/2009/measure#")
+
+PER_INHABITANTS = 100_000
+
+# column names of the CubeFrame, same as the local names of the properties
+DIMENSIONS = ["county", "region", "ref_period"]
+MEASURES = ["number_of_care_providers", "mean_population", "care_providers_per_100k"]
+
+
+def add_rate(columns: pd.DataFrame) -> pd.DataFrame:
+    rate = columns["number_of_care_providers"] / columns["mean_population"]
+    return columns.assign(care_providers_per_100k=(rate * PER_INHABITANTS).round(2))
+
+
+def create_frame(
+    providers: CubeFrame,
+    inhabitants: CubeFrame,
+    codelist: CountyIndex,
+    modified: datetime.date | None = None,
+    year: str | None = None,
+) -> CubeFrame:
+    # both cubes use the same NUTS codes, only the providers need summing up
+    counts = (
+        providers.rollup(["county", "region"])
+        .to_dataframe()[["county", "region", "number_of_care_providers"]]
+        .astype({"county": str, "region": str})
+    )
+    mean_population = inhabitants.to_dataframe().astype(
+        {dimension: str for dimension in DIMENSIONS}
+    )
+    # the register is a snapshot without dates, its counts only match a single year,
+    # the latest one of the population data unless given
+    year = year or mean_population["ref_period"].max()
+    mean_population = mean_population[mean_population["ref_period"] == year]
+
+    # counties without any provider still get a rate of zero
+    columns = mean_population.merge(counts, on=["county", "region"], how="left")
+    columns = columns.fillna({"number_of_care_providers": 0}).astype(
+        {"number_of_care_providers": "int64"}
+    )
+    columns = add_rate(columns)[DIMENSIONS + MEASURES].reset_index(drop=True)
+
+    return CubeFrame(
+        columns,
+        DIMENSIONS,
+        MEASURES,
+        lambda columns: build_datacube(columns, codelist, modified),
+    )
+
+
+def create_datacube(
+    register: pd.DataFrame,
+    population_data: pd.DataFrame,
+    codelist: CountyIndex,
+    modified: datetime.date | None = None,
+    year: str | None = None,
+) -> Graph:
+    providers = care_providers.create_frame(
+        register, codelist, measures=["number_of_care_providers"]
+    )
+    inhabitants = population.create_frame(population_data, codelist)
+    return create_frame(providers, inhabitants, codelist, modified, year).to_graph()
+
+
+def build_datacube(
+    columns: pd.DataFrame,
+    codelist: CountyIndex,
+    modified: datetime.date | None = None,
+) -> Graph:
+    # first published with this run, issued along with the modification
+    modified = modified or modification_date()
+    cube = create_graph()
+    county, region, ref_period = population.add_dimensions(cube)
+    measures = add_measures(cube)
+
+    structure = care_providers.create_structure(
+        cube, [county, region, ref_period], measures, NS.structureProviderRates
+    )
+    dataset = care_providers.create_dataset(
+        cube,
+        structure,
+        NSR.providerRatesDataCubeInstance,
+        "Care providers per 100k inhabitants by county",
+        "Poskytovatelé zdravotních služeb na 100 tisíc obyvatel podle okresů",
+        modified,
+        issued=modified,
+    )
+    create_resources(cube, columns, codelist)
+    create_observations(cube, dataset, columns, "county")
+
+    # rates do not add up, the region rate comes from the summed counts
+    by_region = columns.groupby(["region", "ref_period"], observed=True)[
+        ["number_of_care_providers", "mean_population"]
+    ].sum()
+    by_region = add_rate(by_region.reset_index())
+
+    structure = care_providers.create_structure(
+        cube, [region, ref_period], measures, NS.structureProviderRatesRegion
+    )
+    dataset = care_providers.create_dataset(
+        cube,
+        structure,
+        NSR.providerRatesRegionDataCubeInstance,
+        "Care providers per 100k inhabitants by region",
+        "Poskytovatelé zdravotních služeb na 100 tisíc obyvatel podle krajů",
+        modified,
+        issued=modified,
+    )
+    create_observations(cube, dataset, by_region, "region")
+
+    return cube
+
+
+def add_measures(cube: Graph) -> list[URIRef]:
+    counts = care_providers.add_measures(cube, ["number_of_care_providers"])
+    mean_population = population.add_measures(cube)
+
+    care_providers_per_100k = NS.care_providers_per_100k
+    properties = [
+        (RDF.type, RDFS.Property),
+        (RDF.type, QB.MeasureProperty),
+        (RDFS.label, Literal("Počet poskytovatelů péče na 100 tisíc obyvatel", lang="cs")),
+        (RDFS.label, Literal("Number of care providers per 100k inhabitants", lang="en")),
+        (RDFS.range, XSD.decimal),
+        (RDFS.subPropertyOf, SDMX_MES.obsValue),
+    ]
+    for prop in properties:
+        cube.add((care_providers_per_100k, *prop))
+
+    return counts + mean_population + [care_providers_per_100k]
+
+
+def create_resources(cube: Graph, columns: pd.DataFrame, codelist: CountyIndex) -> None:
+    for code in columns["county"].unique():
+        label = codelist.county_label(code)
+        cube.add((NSR[code], SKOS.prefLabel, Literal(label, lang="cs")))
+
+    for code in columns["region"].unique():
+        label = codelist.region_label(code)
+        cube.add((NSR[code], SKOS.prefLabel, Literal(label, lang="cs")))
+
+
+def create_observations(
+    cube: Graph, dataset: URIRef, columns: pd.DataFrame, level: str
+) -> None:
+    dimensions = DIMENSIONS if level == "county" else ["region", "ref_period"]
+    rows = columns[dimensions + MEASURES].itertuples(index=False)
+    for index, row in enumerate(rows):
+        # named apart from the observations of the source cubes
+        resource = NSR[f"observation-rate-{level}-" + str(index).zfill(4)]
+        cube.add((resource, RDF.type, QB.Observation))
+        cube.add((resource, QB.dataSet, dataset))
+
+        for dimension in dimensions:
+            # the reference period is a calendar year IRI, as in the population cube
+            namespace = population.YEAR if dimension == "ref_period" else NSR
+            cube.add((resource, NS[dimension], namespace[str(getattr(row, dimension))]))
+
+        cube.add(
+            (
+                resource,
+                NS.number_of_care_providers,
+                Literal(int(row.number_of_care_providers), datatype=XSD.integer),
+            )
+        )
+        cube.add(
+            (
+                resource,
+                NS.mean_population,
+                Literal(int(row.mean_population), datatype=XSD.integer),
+            )
+        )
+        rate = Decimal(str(row.care_providers_per_100k))
+        cube.add((resource, NS.care_providers_per_100k, Literal(rate, datatype=XSD.decimal)))
+
+
+def get_frame(
+    modified: datetime.date | None = None,
+    paths: list[str] | None = None,
+    register: pd.DataFrame | None = None,
+    population_data: pd.DataFrame | None = None,
+    year: str | None = None,
+) -> CubeFrame:
+    if register is None:
+        register = care_providers.load_data()
+    if population_data is None:
+        population_data = population.load_data(paths)
+    codelist = load_index(care_providers=register)
+    providers = care_providers.create_frame(
+        register, codelist, measures=["number_of_care_providers"]
+    )
+    inhabitants = population.create_frame(population_data, codelist)
+    return create_frame(providers, inhabitants, codelist, modified, year)
+
+
+def get_cube(
+    modified: datetime.date | None = None,
+    paths: list[str] | None = None,
+    register: pd.DataFrame | None = None,
+    population_data: pd.DataFrame | None = None,
+    year: str | None = None,
+):
+    cube = get_frame(modified, paths, register, population_data, year).to_graph()
+    setattr(cube, "name", "Care providers per 100k inhabitants")
+    cube.bind("qb", QB)
+    cube.bind("skos", SKOS)
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate Care providers per 100k inhabitants data cube"
+    )
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        default=population.SOURCES_POPULATION,
+        help="yearly CZSO population files (defaults to 2021 only)",
+    )
+    parser.add_argument(
+        "--modified",
+        metavar="YYYY-MM-DD",
+        help="pin dcterms:modified (defaults to SOURCE_DATE_EPOCH or today)",
+    )
+    parser.add_argument(
+        "--year",
+        help="population year the register counts are joined with (defaults to the latest)",
+    )
+    args = parser.parse_args()
+
+    print("Generating Care providers per 100k inhabitants data cube")
+    register = care_providers.load_data()
+    population_data = population.load_data(args.sources)
+    try:
+        contracts.enforce(register, population_data, contracts.load_codelist())
+    except contracts.ContractError as error:
+        parser.exit(1, f"{error}\n")
+    cube = get_cube(
+        modification_date(args.modified), args.sources, register, population_data, args.year
+    )
+    metadata = write_graph(cube, "out/provider_rates.ttl")
+    print(f"Generated data cube into out/provider_rates.ttl ({metadata['byte_size']} bytes)")
+    write_snapshot(cube, "out/provider_rates.ttl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import argparse
+import re
+import sys
+from typing import Iterator, TextIO
+
+import pandas as pd
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+QB = "http://purl.org/linked-data/cube#"
+SKOS_PREF_LABEL = "http://www.w3.org/2004/02/skos/core#prefLabel"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+OBSERVATION = QB + "Observation"
+DATASET = QB + "dataSet"
+DIMENSION = QB + "dimension"
+MEASURE = QB + "measure"
+
+INTEGER_TYPES = {
+    XSD + name
+    for name in [
+        "integer",
+        "int",
+        "long",
+        "short",
+        "byte",
+        "nonNegativeInteger",
+        "positiveInteger",
+        "nonPositiveInteger",
+        "negativeInteger",
+        "unsignedInt",
+        "unsignedLong",
+        "unsignedShort",
+        "unsignedByte",
+    ]
+}
+FLOAT_TYPES = {XSD + "decimal", XSD + "double", XSD + "float"}
+
+# predicates that never hold observation values, not worth remembering
+# for subjects whose rdf:type has not been seen yet
+STRUCTURAL = {
+    RDF_TYPE,
+    SKOS_PREF_LABEL,
+    "http://www.w3.org/2000/01/rdf-schema#label",
+    "http://www.w3.org/2000/01/rdf-schema#range",
+    "http://www.w3.org/2000/01/rdf-schema#subPropertyOf",
+} | {
+    QB + name
+    for name in [
+        "observation",
+        "component",
+        "dimension",
+        "measure",
+        "structure",
+        "slice",
+        "sliceKey",
+        "sliceStructure",
+        "componentProperty",
+        "concept",
+    ]
+}
+
+CHUNK_SIZE = 1 << 20
+
+TOKENS = re.compile(
+    r"""
+    (?P<space>(?:\s+|\#[^\n]*)+)
+    |<(?P<iri>[^>]*)>
+    |(?P<long_string>\"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"|'''(?:[^'\\]|\\.|'(?!''))*''')
+    |(?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    |@(?P<lang>[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+    |(?P<datatype>\^\^)
+    |(?P<bnode>_:[\w.-]*[\w-])
+    |(?P<number>[+-]?(?:\d+\.\d+(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\d+))
+    |(?P<keyword>(?:true|false|a|PREFIX|BASE|prefix|base)(?![\w:.-]))
+    |(?P<pname>(?:[A-Za-z][\w.-]*)?:(?:[\w:%-](?:[\w.:%-]*[\w:%-])?)?)
+    |(?P<punctuation>[.;,\[\]()])
+    """,
+    re.VERBOSE,
+)
+
+ESCAPES = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))")
+CHARACTERS = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f"}
+
+
+def _unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+
+    def replace(match: re.Match) -> str:
+        code = match.group(1) or match.group(2)
+        if code:
+            return chr(int(code, 16))
+        return CHARACTERS.get(match.group(3), match.group(3))
+
+    return ESCAPES.sub(replace, value)
+
+
+def tokenize(file: TextIO) -> Iterator[tuple[str, str]]:
+    # matches are only trusted when they end before the buffer does,
+    # a token cut in half by the chunk boundary is matched again after refill
+    buffer = ""
+    position = 0
+    eof = False
+    while True:
+        if not eof and len(buffer) - position < CHUNK_SIZE:
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+        if position >= len(buffer):
+            return
+
+        match = TOKENS.match(buffer, position)
+        if match is None or (match.end() == len(buffer) and not eof):
+            if eof:
+                raise ValueError(f"Invalid Turtle near {buffer[position:position + 40]!r}")
+            chunk = file.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        position = match.end()
+        kind = match.lastgroup
+        if kind != "space":
+            yield kind, match.group(kind)
+
+
+class TurtleParser:
+    # streaming parser for the Turtle subset rdflib writes (and N-Triples),
+    # terms are plain values: IRIs as str, blank nodes as "_:label",
+    # literals as (lexical form, datatype, language)
+    def __init__(self, file: TextIO):
+        self.tokens = tokenize(file)
+        self.lookahead = None
+        self.prefixes = {}
+        self.base = ""
+        self.bnodes = 0
+
+    def peek(self) -> tuple[str, str] | None:
+        if self.lookahead is None:
+            self.lookahead = next(self.tokens, None)
+        return self.lookahead
+
+    def next(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of file")
+        self.lookahead = None
+        return token
+
+    def expect(self, value: str) -> None:
+        kind, token = self.next()
+        if token != value:
+            raise ValueError(f"Expected {value!r}, found {token!r}")
+
+    def new_bnode(self) -> str:
+        self.bnodes += 1
+        return f"_:b{self.bnodes}"
+
+    def resolve(self, kind: str, token: str) -> str:
+        if kind == "iri":
+            iri = _unescape(token)
+            return iri if ":" in iri else self.base + iri
+        prefix, _, local = token.partition(":")
+        if prefix not in self.prefixes:
+            raise ValueError(f"Unknown prefix {prefix!r}")
+        return self.prefixes[prefix] + re.sub(r"\\(.)", r"\1", local)
+
+    def triples(self) -> Iterator[tuple]:
+        while self.peek() is not None:
+            kind, token = self.peek()
+            if token in ("@prefix", "PREFIX", "prefix") or kind == "lang" and token == "prefix":
+                self.next()
+                self.directive_prefix(token.startswith("@") or kind == "lang")
+            elif kind == "lang" and token == "base" or token in ("BASE", "base"):
+                self.next()
+                self.directive_base(kind == "lang")
+            else:
+                yield from self.statement()
+                self.expect(".")
+
+    def directive_prefix(self, terminated: bool) -> None:
+        kind, prefix = self.next()
+        kind, iri = self.next()
+        self.prefixes[prefix.rstrip(":")] = self.resolve("iri", iri)
+        if terminated:
+            self.expect(".")
+
+    def directive_base(self, terminated: bool) -> None:
+        kind, iri = self.next()
+        self.base = self.resolve("iri", iri)
+        if terminated:
+            self.expect(".")
+
+    def statement(self) -> Iterator[tuple]:
+        if self.peek()[1] == "[":
+            self.next()
+            subject = self.new_bnode()
+            if self.peek()[1] != "]":
+                yield from self.predicate_objects(subject)
+            self.expect("]")
+            if self.peek()[1] == ".":
+                return
+        else:
+            subject = self.term(*self.next())
+        yield from self.predicate_objects(subject)
+
+    def predicate_objects(self, subject: str) -> Iterator[tuple]:
+        while True:
+            kind, token = self.next()
+            predicate = RDF_TYPE if token == "a" else self.term(kind, token)
+            while True:
+                obj = yield from self.object()
+                yield subject, predicate, obj
+                if self.peek()[1] != ",":
+                    break
+                self.next()
+            if self.peek()[1] != ";":
+                return
+            while self.peek()[1] == ";":
+                self.next()
+            if self.peek()[1] in (".", "]"):
+                return
+
+    def object(self) -> Iterator[tuple]:
+        kind, token = self.next()
+        if token == "[":
+            node = self.new_bnode()
+            if self.peek()[1] != "]":
+                yield from self.predicate_objects(node)
+            self.expect("]")
+            return node
+        if token == "(":
+            head = "http://www.w3.org/1999/02/22-rdf-syntax-ns#nil"
+            items = []
+            while self.peek()[1] != ")":
+                items.append((yield from self.object()))
+            self.next()
+            for item in reversed(items):
+                node = self.new_bnode()
+                yield node, "http://www.w3.org/1999/02/22-rdf-syntax-ns#first", item
+                yield node, "http://www.w3.org/1999/02/22-rdf-syntax-ns#rest", head
+                head = node
+            return head
+        return self.term(kind, token)
+
+    def term(self, kind: str, token: str):
+        if kind in ("iri", "pname"):
+            return self.resolve(kind, token)
+        if kind == "bnode":
+            return token
+        if kind == "number":
+            if "e" in token or "E" in token:
+                return token, XSD + "double", None
+            return token, XSD + ("decimal" if "." in token else "integer"), None
+        if kind == "keyword" and token in ("true", "false"):
+            return token, XSD + "boolean", None
+        if kind in ("string", "long_string"):
+            quote = 3 if kind == "long_string" else 1
+            value = _unescape(token[quote:-quote])
+            following = self.peek()
+            if following is not None and following[0] == "lang":
+                self.next()
+                return value, None, following[1].lower()
+            if following is not None and following[0] == "datatype":
+                self.next()
+                return value, self.resolve(*self.next()), None
+            return value, XSD + "string", None
+        raise ValueError(f"Unexpected token {token!r}")
+
+
+def local_name(iri: str) -> str:
+    return iri.replace("#", "/").split("/")[-1]
+
+
+def _code(value) -> str | None:
+    # dimension values are resources, their code is the local name
+    if value is None:
+        return None
+    if isinstance(value, tuple):
+        return value[0]
+    return local_name(value)
+
+
+def _convert(values: list, datatypes: set) -> pd.Series:
+    series = pd.Series(values, dtype="object")
+    if datatypes and datatypes <= INTEGER_TYPES:
+        series = pd.to_numeric(series)
+        return series.astype("Int64") if series.isna().any() else series.astype("int64")
+    if datatypes and datatypes <= INTEGER_TYPES | FLOAT_TYPES:
+        return pd.to_numeric(series).astype("float64")
+    return series.astype("string")
+
+
+def read_cube(path: str, dataset: str | None = None, labels: bool = False) -> pd.DataFrame:
+    # only observations, component declarations and labels are kept; triples of
+    # a subject are held back until its rdf:type tells whether it is an observation,
+    # so only untyped subjects (and the triples before the type) stay until the end
+    observations = {}
+    pending = {}
+    # subjects typed as anything but an observation, their triples are dropped
+    others = set()
+    dimensions = []
+    measures = []
+    names = {}
+
+    with open(path, encoding="utf-8") as file:
+        for subject, predicate, obj in TurtleParser(file).triples():
+            if predicate == RDF_TYPE:
+                if obj == OBSERVATION:
+                    if subject not in observations:
+                        observations[subject] = pending.pop(subject, {})
+                        others.discard(subject)
+                elif subject not in observations:
+                    others.add(subject)
+                    pending.pop(subject, None)
+            elif predicate == DIMENSION:
+                if obj not in dimensions:
+                    dimensions.append(obj)
+            elif predicate == MEASURE:
+                if obj not in measures:
+                    measures.append(obj)
+            elif predicate == SKOS_PREF_LABEL:
+                if labels and subject not in names:
+                    names[subject] = obj[0]
+            elif subject in observations:
+                observations[subject][predicate] = obj
+            elif (
+                predicate not in STRUCTURAL
+                and not subject.startswith("_:")
+                and subject not in others
+            ):
+                pending.setdefault(subject, {})[predicate] = obj
+
+    if dataset is not None:
+        observations = {
+            subject: values
+            for subject, values in observations.items()
+            if values.get(DATASET) == dataset
+        }
+
+    subjects = sorted(observations)
+    columns = {}
+    for dimension in dimensions:
+        values = [observations[subject].get(dimension) for subject in subjects]
+        if all(value is None for value in values):
+            continue
+        name = local_name(dimension)
+        codes = [_code(value) for value in values]
+        columns[name] = pd.Series(codes, dtype="category")
+        if labels:
+            columns[name + "_label"] = pd.Series(
+                [names.get(value) for value in values], dtype="string"
+            )
+
+    for measure in measures:
+        values = [observations[subject].get(measure) for subject in subjects]
+        if all(value is None for value in values):
+            continue
+        datatypes = {value[1] for value in values if value is not None}
+        lexical = [None if value is None else value[0] for value in values]
+        columns[local_name(measure)] = _convert(lexical, datatypes)
+
+    frame = pd.DataFrame(columns)
+    frame.index = pd.Index([local_name(subject) for subject in subjects], name="observation")
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read observations of a data cube as CSV")
+    parser.add_argument("path", help="Turtle or N-Triples file with the cube")
+    parser.add_argument("--dataset", help="IRI of the dataset to read, all by default")
+    parser.add_argument("--labels", action="store_true", help="add skos:prefLabel columns")
+    args = parser.parse_args()
+
+    frame = read_cube(args.path, args.dataset, args.labels)
+    frame.to_csv(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import secrets
+
+from rdflib import Graph
+from rdflib.util import guess_format
+
+from cubes.store import create_graph
+
+SNAPSHOT_SUFFIX = ".snapshot"
+# bump whenever ObservationStore changes its attributes
+SNAPSHOT_VERSION = 3
+
+# snapshots are signed with a key only this user can read, a snapshot that came
+# with a downloaded cube is never unpickled
+KEY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ndbi046", "snapshot.key")
+
+
+def snapshot_path(path: str) -> str:
+    return path + SNAPSHOT_SUFFIX
+
+
+def _fingerprint(path: str) -> list[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _key(create: bool = False) -> bytes | None:
+    path = os.environ.get("NDBI046_SNAPSHOT_KEY", KEY_PATH)
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        if not create:
+            return None
+
+    key = secrets.token_bytes(32)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # O_EXCL so concurrent builders agree on a single key
+    try:
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return _key()
+    with os.fdopen(descriptor, "wb") as file:
+        file.write(key)
+    return key
+
+
+def _signature(key: bytes, header: bytes, payload: bytes) -> str:
+    signature = hmac.new(key, header, hashlib.sha256)
+    signature.update(payload)
+    return signature.hexdigest()
+
+
+def write_snapshot(graph: Graph, path: str) -> str | None:
+    # a snapshot only speeds up loading, the output is fine without it
+    snapshot = snapshot_path(path)
+    try:
+        key = _key(create=True)
+        header = json.dumps(
+            {"version": SNAPSHOT_VERSION, "source": _fingerprint(path)}
+        ).encode("utf-8")
+        payload = pickle.dumps(graph.store, protocol=pickle.HIGHEST_PROTOCOL)
+        signature = _signature(key, header, payload).encode("ascii")
+
+        # write next to the target first, so readers never see a partial file
+        with open(snapshot + ".tmp", "wb") as file:
+            file.write(header + b"\n" + signature + b"\n" + payload)
+        os.replace(snapshot + ".tmp", snapshot)
+    except OSError:
+        return None
+    return snapshot
+
+
+def read_snapshot(path: str) -> Graph | None:
+    try:
+        key = _key()
+        with open(snapshot_path(path), "rb") as file:
+            header = file.readline().rstrip(b"\n")
+            signature = file.readline().rstrip(b"\n")
+            content = json.loads(header)
+            # the snapshot is stale once the serialized file changes
+            if (
+                key is None
+                or not isinstance(content, dict)
+                or content.get("version") != SNAPSHOT_VERSION
+                or content.get("source") != _fingerprint(path)
+            ):
+                return None
+            payload = file.read()
+    except (OSError, ValueError):
+        return None
+
+    # only unpickle what was signed with our key
+    expected = _signature(key, header, payload).encode("ascii")
+    if not hmac.compare_digest(signature, expected):
+        return None
+    try:
+        store = pickle.loads(payload)
+    except (pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    return Graph(store=store)
+
+
+def load_graph(path: str, format: str | None = None) -> Graph:
+    graph = read_snapshot(path)
+    if graph is not None:
+        return graph
+
+    graph = create_graph()
+    graph.parse(path, format=format or guess_format(path) or "ttl")
+    write_snapshot(graph, path)
+    return graph
@@ -0,0 +1,80 @@
+import gzip
+import os
+import zipfile
+from typing import BinaryIO
+
+import pandas as pd
+
+# magic bytes at the start of each supported archive
+SIGNATURES = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"PK\x03\x04": "zip",
+}
+EXTENSIONS = {".gz": "gzip", ".zst": "zstd", ".zip": "zip"}
+
+# (path, options) -> (fingerprint, frame), only enabled in long running processes
+_CACHE = None
+
+
+def find_source(path: str) -> str:
+    # a compressed copy next to the expected path is used in its place
+    if os.path.exists(path):
+        return path
+    for extension in EXTENSIONS:
+        if os.path.exists(path + extension):
+            return path + extension
+    raise FileNotFoundError(f"Source {path} not found, not even compressed")
+
+
+def detect_compression(path: str) -> str | None:
+    with open(path, "rb") as file:
+        start = file.read(4)
+    for signature, compression in SIGNATURES.items():
+        if start.startswith(signature):
+            return compression
+    return EXTENSIONS.get(os.path.splitext(path)[1])
+
+
+def open_source(path: str) -> BinaryIO:
+    # decompressed while it is read, nothing is extracted to disk
+    path = find_source(path)
+    compression = detect_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as error:
+            raise ImportError(f"Install zstandard to read {path}") from error
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    if compression == "zip":
+        archive = zipfile.ZipFile(path)
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) != 1:
+            archive.close()
+            raise ValueError(f"Expected a single file in {path}, found {len(members)}")
+        return archive.open(members[0])
+    return open(path, "rb")
+
+
+def enable_cache() -> None:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = {}
+
+
+def read_source(path: str, **kwargs) -> pd.DataFrame:
+    if _CACHE is None:
+        with open_source(path) as file:
+            return pd.read_csv(file, **kwargs)
+
+    path = os.path.abspath(find_source(path))
+    stat = os.stat(path)
+    key = (path, repr(sorted(kwargs.items())))
+    fingerprint = (stat.st_size, stat.st_mtime_ns)
+    if key not in _CACHE or _CACHE[key][0] != fingerprint:
+        with open_source(path) as file:
+            _CACHE[key] = (fingerprint, pd.read_csv(file, **kwargs))
+    # callers are free to modify the frame they get
+    return _CACHE[key][1].copy()
@@ -0,0 +1,210 @@
+from array import array
+
+from rdflib import Graph, URIRef
+from rdflib.namespace import QB, RDF
+from rdflib.plugins.stores.memory import Memory
+from rdflib.store import Store
+
+MISSING = -1
+
+
+class ObservationStore(Store):
+    # observations are stored as one column per property, everything else
+    # (structure, resources, slices, multi valued properties) goes to a Memory store
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration, identifier)
+        self.resources = Memory()
+        # observation subject -> row, and the subjects in row order
+        self.rows: dict[URIRef, int] = {}
+        self.subjects: list[URIRef | None] = []
+        # whether the row still has its (subject, rdf:type, qb:Observation) triple
+        self.typed = bytearray()
+        # property -> term ids, one per row
+        self.columns: dict[URIRef, array] = {}
+        # terms are dictionary encoded, dimension values repeat a lot
+        self.terms: list = []
+        self.term_ids: dict = {}
+        # property -> term id -> rows, built on demand for bound objects
+        self.inverted: dict[URIRef, dict[int, list[int]]] = {}
+        self.size = 0
+
+    def _term_id(self, term) -> int:
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self.term_ids[term] = term_id
+        return term_id
+
+    def _add_observation(self, subject: URIRef) -> None:
+        self.rows[subject] = len(self.subjects)
+        self.subjects.append(subject)
+        self.typed.append(1)
+        for column in self.columns.values():
+            column.append(MISSING)
+        self.size += 1
+
+        # triples added before the type move into the columns
+        existing = [triple for triple, _ in self.resources.triples((subject, None, None))]
+        for triple in existing:
+            self.resources.remove(triple)
+            self.add(triple)
+
+    def _column(self, predicate: URIRef) -> array:
+        column = self.columns.get(predicate)
+        if column is None:
+            column = array("i", [MISSING]) * len(self.subjects)
+            self.columns[predicate] = column
+        return column
+
+    def add(self, triple, context=None, quoted=False) -> None:
+        Store.add(self, triple, context, quoted)
+        subject, predicate, object_ = triple
+
+        if predicate == RDF.type and object_ == QB.Observation:
+            row = self.rows.get(subject)
+            if row is None:
+                self._add_observation(subject)
+            elif not self.typed[row]:
+                self.typed[row] = 1
+                self.size += 1
+            return
+
+        row = self.rows.get(subject)
+        if row is not None and predicate != RDF.type:
+            column = self._column(predicate)
+            term_id = self._term_id(object_)
+            if column[row] == MISSING:
+                column[row] = term_id
+                self.inverted.pop(predicate, None)
+                self.size += 1
+                return
+            if column[row] == term_id:
+                return
+
+        self.resources.add(triple, None, quoted)
+
+    def remove(self, triple_pattern, context=None) -> None:
+        for triple, _ in list(self.triples(triple_pattern)):
+            subject, predicate, object_ = triple
+            row = self.rows.get(subject)
+            column = self.columns.get(predicate)
+
+            if predicate == RDF.type and object_ == QB.Observation and row is not None:
+                self.typed[row] = 0
+                self.size -= 1
+                self._drop_empty_row(subject, row)
+            elif (
+                row is not None
+                and column is not None
+                and column[row] == self.term_ids.get(object_)
+            ):
+                column[row] = MISSING
+                self.inverted.pop(predicate, None)
+                self.size -= 1
+                self._drop_empty_row(subject, row)
+            else:
+                self.resources.remove(triple)
+
+    def _drop_empty_row(self, subject: URIRef, row: int) -> None:
+        # the row is detached from its subject once none of its triples are left
+        if self.typed[row] or any(column[row] != MISSING for column in self.columns.values()):
+            return
+        del self.rows[subject]
+        self.subjects[row] = None
+
+    def _rows_with(self, predicate: URIRef, object_) -> list[int]:
+        term_id = self.term_ids.get(object_)
+        if term_id is None:
+            return []
+        index = self.inverted.get(predicate)
+        if index is None:
+            index = {}
+            for row, value in enumerate(self.columns[predicate]):
+                if value != MISSING:
+                    index.setdefault(value, []).append(row)
+            self.inverted[predicate] = index
+        return index.get(term_id, [])
+
+    def _row_triples(self, row: int, predicate, object_):
+        subject = self.subjects[row]
+        if subject is None:
+            return
+        if self.typed[row] and (predicate is None or predicate == RDF.type):
+            if object_ is None or object_ == QB.Observation:
+                yield subject, RDF.type, QB.Observation
+        if predicate is None:
+            for column_predicate, column in self.columns.items():
+                if column[row] != MISSING:
+                    value = self.terms[column[row]]
+                    if object_ is None or object_ == value:
+                        yield subject, column_predicate, value
+        elif predicate in self.columns:
+            value_id = self.columns[predicate][row]
+            if value_id != MISSING:
+                value = self.terms[value_id]
+                if object_ is None or object_ == value:
+                    yield subject, predicate, value
+
+    def _observation_triples(self, triple_pattern):
+        subject, predicate, object_ = triple_pattern
+
+        if subject is not None:
+            row = self.rows.get(subject)
+            if row is not None:
+                yield from self._row_triples(row, predicate, object_)
+            return
+
+        if predicate == RDF.type:
+            if object_ is None or object_ == QB.Observation:
+                for observation, row in self.rows.items():
+                    if self.typed[row]:
+                        yield observation, RDF.type, QB.Observation
+            return
+
+        if predicate is not None:
+            if predicate not in self.columns:
+                return
+            if object_ is not None:
+                rows = self._rows_with(predicate, object_)
+            else:
+                rows = range(len(self.subjects))
+            for row in rows:
+                yield from self._row_triples(row, predicate, object_)
+            return
+
+        for row in range(len(self.subjects)):
+            yield from self._row_triples(row, None, object_)
+
+    def triples(self, triple_pattern, context=None):
+        for triple, contexts in self.resources.triples(triple_pattern):
+            yield triple, contexts
+        for triple in self._observation_triples(triple_pattern):
+            yield triple, iter(())
+
+    def __len__(self, context=None) -> int:
+        return len(self.resources) + self.size
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True) -> None:
+        self.resources.bind(prefix, namespace, override)
+
+    def namespace(self, prefix):
+        return self.resources.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.resources.prefix(namespace)
+
+    def namespaces(self):
+        return self.resources.namespaces()
+
+
+def create_graph() -> Graph:
+    return Graph(store=ObservationStore())
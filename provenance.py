@@ -2,10 +2,18 @@ import datetime
 import os
 
 from rdflib import BNode, Graph, Literal, Namespace, URIRef
-from rdflib.namespace import RDF, PROV, FOAF, DCTERMS, XSD
+from rdflib.namespace import RDF, RDFS, PROV, FOAF, DCTERMS, XSD
+
+from cubes.lineage import lineage_path, read_lineage
 
 NSR = Namespace("https://milan252525.github.io/resources/")
 
+# cube entity -> generated file, linked to its lineage sidecar when one was recorded
+LINEAGE_FILES = {
+    NSR.careProvidersDataCubeInstance: "out/care_providers.ttl",
+    NSR.populationDataCubeInstance: "out/population.ttl",
+}
+
 def add_entities(prov: Graph) -> tuple[Graph, URIRef, URIRef]:
     # care providers data cube
     care = NSR.careProvidersDataCubeInstance
@@ -94,7 +102,7 @@ def add_activities(prov: Graph, care: URIRef, pop: URIRef, author: URIRef, airfl
     prov.add((run, PROV.endedAtTime, Literal(datetime.datetime(2023, 4, 10, 16, 5), datatype=XSD.date)))
 
     #qualified usage
-    usage = BNode()
+    usage = BNode("scriptAuthorUsage")
     prov.add((usage, RDF.type, PROV.Usage))
     prov.add((usage, PROV.entity, author))
     prov.add((usage, PROV.hadRole, role))
@@ -105,12 +113,42 @@ def add_activities(prov: Graph, care: URIRef, pop: URIRef, author: URIRef, airfl
     return prov
 
 
+def add_lineage(prov: Graph) -> Graph:
+    for cube, path in LINEAGE_FILES.items():
+        content = read_lineage(path)
+        # a sidecar older than the cube is left over from an earlier build
+        if content is None or os.path.getmtime(lineage_path(path)) < os.path.getmtime(path):
+            continue
+
+        # the sidecar maps every observation to its rows in these files
+        sidecar = NSR[os.path.basename(lineage_path(path))]
+        prov.add((sidecar, RDF.type, PROV.Entity))
+        prov.add((sidecar, PROV.atLocation, Literal(lineage_path(path))))
+        prov.add((sidecar, DCTERMS.format, Literal("application/json")))
+
+        for source in content["sources"]:
+            file = URIRef("urn:sha256:" + source["sha256"])
+            prov.add((file, RDF.type, PROV.Entity))
+            prov.add((file, PROV.atLocation, Literal(source["path"])))
+            prov.add((cube, PROV.wasDerivedFrom, file))
+
+            derivation = BNode(f"{os.path.basename(path)}-{source['sha256'][:16]}")
+            prov.add((derivation, RDF.type, PROV.Derivation))
+            prov.add((derivation, PROV.entity, file))
+            prov.add((derivation, RDFS.seeAlso, sidecar))
+            prov.add((cube, PROV.qualifiedDerivation, derivation))
+
+    return prov
+
+
 def create_provenance() -> Graph:
-    prov = Graph()
+    # a fixed graph name instead of a random blank node keeps the TriG output stable
+    prov = Graph(identifier=NSR.provenance)
 
     prov, data1, data2 = add_entities(prov)
     prov, author, script = add_agents(prov)
     prov = add_activities(prov, data1, data2, author, script)
+    prov = add_lineage(prov)
 
     return prov
 
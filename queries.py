@@ -1,7 +1,19 @@
+import argparse
+import math
+import os
+import random
+from string import Template
+
+from rdflib.namespace import QB, RDF
+
 from cubes import care_providers, population
+from cubes.snapshot import load_graph
 
+# observation level checks are templates, $form is ASK when the whole cube is checked
+# and $values binds ?obs to the sampled observations, see observation_query
 UNIQUE_DATASET = """
-ASK {
+$form {
+  $values
   {
     # Check observation has a data set
     ?obs a qb:Observation .
@@ -63,19 +75,23 @@ ASK {
 }
 """
 
+# the blank node inside FILTER NOT EXISTS made this one throw,
+# so it uses a named variable for the DSD instead
 SLICE_KEYS = """
 ASK {
     ?sliceKey a qb:SliceKey .
-    FILTER NOT EXISTS { [a qb:DataStructureDefinition] qb:sliceKey ?sliceKey }
+    FILTER NOT EXISTS { ?dsd a qb:DataStructureDefinition ; qb:sliceKey ?sliceKey }
 }
 """
 
+# components are declared with qb:dimension (a subproperty of qb:componentProperty)
+# and there is no inference, so both properties are accepted
 SLICE_CONSISTENT = """
 ASK {
   ?slicekey a qb:SliceKey;
       qb:componentProperty ?prop .
   ?dsd qb:sliceKey ?slicekey .
-  FILTER NOT EXISTS { ?dsd qb:component [qb:componentProperty ?prop] }
+  FILTER NOT EXISTS { ?dsd qb:component/(qb:componentProperty|qb:dimension) ?prop }
 }
 """
 
@@ -102,74 +118,60 @@ ASK {
 """
 
 ALL_DIM = """
-ASK {
-    ?obs qb:dataSet/qb:structure/qb:component/qb:componentProperty ?dim .
+$form {
+    $values
+    ?obs qb:dataSet/qb:structure/qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?dim .
     ?dim a qb:DimensionProperty;
     FILTER NOT EXISTS { ?obs ?dim [] }
 }
 """
 
-NO_DUP_OBS = """
-ASK {
-  FILTER( ?allEqual )
-  {
-    # For each pair of observations test if all the dimension values are the same
-    SELECT (MIN(?equal) AS ?allEqual) WHERE {
-        ?obs1 qb:dataSet ?dataset .
-        ?obs2 qb:dataSet ?dataset .
-        FILTER (?obs1 != ?obs2)
-        ?dataset qb:structure/qb:component/qb:componentProperty ?dim .
-        ?dim a qb:DimensionProperty .
-        ?obs1 ?dim ?value1 .
-        ?obs2 ?dim ?value2 .
-        BIND( ?value1 = ?value2 AS ?equal)
-    } GROUP BY ?obs1 ?obs2
-  }
-}
-"""
-
 REQUIRED_ATT = """
-ASK {
+$form {
+    $values
     ?obs qb:dataSet/qb:structure/qb:component ?component .
     ?component qb:componentRequired "true"^^xsd:boolean ;
-               qb:componentProperty ?attr .
+               qb:componentProperty|qb:attribute ?attr .
     FILTER NOT EXISTS { ?obs ?attr [] }
 }
 """
 
 ALL_MEASURES = """
-ASK {
+$form {
+    $values
     # Observation in a non-measureType cube
     ?obs qb:dataSet/qb:structure ?dsd .
-    FILTER NOT EXISTS { ?dsd qb:component/qb:componentProperty qb:measureType }
+    FILTER NOT EXISTS { ?dsd qb:component/(qb:componentProperty|qb:dimension|qb:measure) qb:measureType }
 
     # verify every measure is present
-    ?dsd qb:component/qb:componentProperty ?measure .
+    ?dsd qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?measure .
     ?measure a qb:MeasureProperty;
     FILTER NOT EXISTS { ?obs ?measure [] }
 }
 """
 
 MEASURE_DIM_CONSISTENT = """
-ASK {
+$form {
+    $values
     # Observation in a measureType-cube
     ?obs qb:dataSet/qb:structure ?dsd ;
          qb:measureType ?measure .
-    ?dsd qb:component/qb:componentProperty qb:measureType .
+    ?dsd qb:component/(qb:componentProperty|qb:dimension|qb:measure) qb:measureType .
     # Must have value for its measureType
     FILTER NOT EXISTS { ?obs ?measure [] }
 }
 """
 
 SINGLE_MEASURE = """
-ASK {
+$form {
+    $values
     # Observation with measureType
     ?obs qb:dataSet/qb:structure ?dsd ;
          qb:measureType ?measure ;
          ?omeasure [] .
     # Any measure on the observation
-    ?dsd qb:component/qb:componentProperty qb:measureType ;
-         qb:component/qb:componentProperty ?omeasure .
+    ?dsd qb:component/(qb:componentProperty|qb:dimension|qb:measure) qb:measureType ;
+         qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?omeasure .
     ?omeasure a qb:MeasureProperty .
     # Must be the same as the measureType
     FILTER (?omeasure != ?measure)
@@ -184,7 +186,7 @@ ASK {
           {
               # Find the DSDs and check how many measures they have
               SELECT ?dsd (COUNT(?m) AS ?numMeasures) WHERE {
-                  ?dsd qb:component/qb:componentProperty ?m.
+                  ?dsd qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?m.
                   ?m a qb:MeasureProperty .
               } GROUP BY ?dsd
           }
@@ -198,7 +200,7 @@ ASK {
           ?obs2 qb:dataSet ?dataset ;
                 qb:measureType ?m2 .
           FILTER NOT EXISTS {
-              ?dsd qb:component/qb:componentProperty ?dim .
+              ?dsd qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?dim .
               FILTER (?dim != qb:measureType)
               ?dim a qb:DimensionProperty .
               ?obs1 ?dim ?v1 .
@@ -213,7 +215,8 @@ ASK {
 """
 
 CONSISTENT_DATASET_LINKS = """
-ASK {
+$form {
+    $values
     ?dataset qb:slice       ?slice .
     ?slice   qb:observation ?obs .
     FILTER NOT EXISTS { ?obs qb:dataSet ?dataset . }
@@ -221,8 +224,9 @@ ASK {
 """
 
 CODES_FROM_CODE_LISTS_1 = """
-ASK {
-    ?obs qb:dataSet/qb:structure/qb:component/qb:componentProperty ?dim .
+$form {
+    $values
+    ?obs qb:dataSet/qb:structure/qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?dim .
     ?dim a qb:DimensionProperty ;
         qb:codeList ?list .
     ?list a skos:ConceptScheme .
@@ -232,8 +236,9 @@ ASK {
 """
 
 CODES_FROM_CODE_LISTS_2 = """
-ASK {
-    ?obs qb:dataSet/qb:structure/qb:component/qb:componentProperty ?dim .
+$form {
+    $values
+    ?obs qb:dataSet/qb:structure/qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?dim .
     ?dim a qb:DimensionProperty ;
         qb:codeList ?list .
     ?list a skos:Collection .
@@ -243,8 +248,9 @@ ASK {
 """
 
 CODES_FROM_HIERARCHY = """
-ASK {
-    ?obs qb:dataSet/qb:structure/qb:component/qb:componentProperty ?dim .
+$form {
+    $values
+    ?obs qb:dataSet/qb:structure/qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?dim .
     ?dim a qb:DimensionProperty ;
         qb:codeList ?list .
     ?list a qb:HierarchicalCodeList .
@@ -254,8 +260,9 @@ ASK {
 """
 
 CODES_FROM_HIERARCHY_INVERSE = """
-ASK {
-    ?obs qb:dataSet/qb:structure/qb:component/qb:componentProperty ?dim .
+$form {
+    $values
+    ?obs qb:dataSet/qb:structure/qb:component/(qb:componentProperty|qb:dimension|qb:measure) ?dim .
     ?dim a qb:DimensionProperty ;
          qb:codeList ?list .
     ?list a qb:HierarchicalCodeList .
@@ -264,24 +271,74 @@ ASK {
 }
 """
 
+def observation_query(template: str, values: str = "") -> str:
+    # ASK over the whole cube, or the violating observations among the VALUES block
+    form = "SELECT DISTINCT ?obs WHERE" if values else "ASK"
+    return Template(template).safe_substitute(form=form, values=values)
+
+
+def dataset_dimensions(cube, dataset) -> list:
+    dimensions = []
+    for component in cube.objects(cube.value(dataset, QB.structure), QB.component):
+        for prop in (QB.componentProperty, QB.dimension):
+            for dim in cube.objects(component, prop):
+                if (dim, RDF.type, QB.DimensionProperty) in cube:
+                    dimensions.append(dim)
+    return sorted(set(dimensions))
+
+
+def has_duplicate_observations(cube) -> bool:
+    # the dimension values are compared as keys built here, SPARQL gives
+    # no order to GROUP_CONCAT and comparing every pair is quadratic
+    keys = set()
+    dimensions = {}
+    for obs, dataset in cube.subject_objects(QB.dataSet):
+        if dataset not in dimensions:
+            dimensions[dataset] = dataset_dimensions(cube, dataset)
+        if not dimensions[dataset]:
+            continue
+        key = (dataset,) + tuple(frozenset(cube.objects(obs, dim)) for dim in dimensions[dataset])
+        if key in keys:
+            return True
+        keys.add(key)
+    return False
+
+
 queries = {
-    "Unique DataSet": UNIQUE_DATASET,
+    "Unique DataSet": observation_query(UNIQUE_DATASET),
     "Unique DSD": UNIQUE_DSD,
     "DSD includes measure": DSD_INCLUDES_MEASURE,
     "Dimensions have range": DIMENSIONS_HAVE_RANGE,
     "Concept dimensions have code lists": CODE_LISTS,
     "Only attributes may be optional": ATTR_OPT,
-    # "Slice Keys must be declared":SLICE_KEYS, # throws error, but we dont use slices anyway
+    "Slice Keys must be declared": SLICE_KEYS,
     "Slice Keys consistent with DSD": SLICE_CONSISTENT,
     "Unique slice structure": UNIQUE_SLICE,
     "Slice dimensions complete": SLICE_DIM,
+    "All dimensions required": observation_query(ALL_DIM),
+    "No duplicate observations": has_duplicate_observations,
+    "Required attributes": observation_query(REQUIRED_ATT),
+    "All measures present": observation_query(ALL_MEASURES),
+    "Measure dimension consistent": observation_query(MEASURE_DIM_CONSISTENT),
+    "Single measure on measure dimension observation": observation_query(SINGLE_MEASURE),
+    "All measures present in measures dimension cube": ALL_MEASURES_PRESENT_IN_MEASURES,
+    "Consistent data set links": observation_query(CONSISTENT_DATASET_LINKS),
+    "Codes from code list 1": observation_query(CODES_FROM_CODE_LISTS_1),
+    "Codes from code list 2": observation_query(CODES_FROM_CODE_LISTS_2),
+    "Codes from hierarchy": observation_query(CODES_FROM_HIERARCHY),
+    "Codes from hierarchy (inverse)": observation_query(CODES_FROM_HIERARCHY_INVERSE),
+}
+
+
+# checks broken by single observations, counted towards the violation rate of a sample
+OBSERVATION_CHECKS = {
+    "Unique DataSet": UNIQUE_DATASET,
     "All dimensions required": ALL_DIM,
-    "No duplicate observations": NO_DUP_OBS,
+    "No duplicate observations": has_duplicate_observations,
     "Required attributes": REQUIRED_ATT,
     "All measures present": ALL_MEASURES,
     "Measure dimension consistent": MEASURE_DIM_CONSISTENT,
     "Single measure on measure dimension observation": SINGLE_MEASURE,
-    "All measures present in measures dimension cube": ALL_MEASURES_PRESENT_IN_MEASURES,
     "Consistent data set links": CONSISTENT_DATASET_LINKS,
     "Codes from code list 1": CODES_FROM_CODE_LISTS_1,
     "Codes from code list 2": CODES_FROM_CODE_LISTS_2,
@@ -290,27 +347,168 @@ queries = {
 }
 
 
+def bind_prefixes(cube):
+    # required bindings
+    cube.bind("rdf", "http://www.w3.org/1999/02/22-rdf-syntax-ns#")
+    cube.bind("rdfs", "http://www.w3.org/2000/01/rdf-schema#")
+    cube.bind("skos", "http://www.w3.org/2004/02/skos/core#")
+    cube.bind("qb", "http://purl.org/linked-data/cube#")
+    cube.bind("xsd", "http://www.w3.org/2001/XMLSchema#")
+    cube.bind("owl", "http://www.w3.org/2002/07/owl#")
+
+
+def run_check(cube, query) -> bool:
+    # a few checks are Python functions of the cube instead of SPARQL
+    if callable(query):
+        return query(cube)
+    return bool(cube.query(query))
+
+
 def run_qb_check(cube, checks):
     for check, query in checks.items():
-        result = cube.query(query)
-        print(f"{bool(result)} {check}")
+        print(f"{run_check(cube, query)} {check}")
+
+
+def sample_observations(cube, size: int, seed: int) -> tuple[list, int]:
+    # only the observation subjects are listed, the triples of the cube are not copied
+    observations = sorted(cube.subjects(RDF.type, QB.Observation))
+    sample = random.Random(seed).sample(observations, min(size, len(observations)))
+    return sorted(sample), len(observations)
+
+
+def duplicated_observations(cube, observations: list) -> set:
+    # other observations of the data set are looked up through the index of the store
+    duplicated = set()
+    dimensions = {}
+    for obs in observations:
+        for dataset in cube.objects(obs, QB.dataSet):
+            if dataset not in dimensions:
+                dimensions[dataset] = dataset_dimensions(cube, dataset)
+            others = None
+            for dim in dimensions[dataset]:
+                matches = {
+                    other
+                    for value in cube.objects(obs, dim)
+                    for other in cube.subjects(dim, value)
+                }
+                others = matches if others is None else others & matches
+            if any(
+                other != obs and (other, QB.dataSet, dataset) in cube
+                for other in others or ()
+            ):
+                duplicated.add(obs)
+    return duplicated
+
+
+def violating_observations(cube, observations: list) -> dict[str, set]:
+    # the observation checks are evaluated on the full cube with ?obs bound to the sample
+    values = "VALUES ?obs { " + " ".join(obs.n3() for obs in observations) + " }"
+    violating = {}
+    for check, template in OBSERVATION_CHECKS.items():
+        if template is has_duplicate_observations:
+            violating[check] = duplicated_observations(cube, observations)
+            continue
+        query = observation_query(template, values)
+        violating[check] = {row[0] for row in cube.query(query) if row[0] is not None}
+    return violating
+
+
+def binomial_tail(violations: int, size: int, rate: float) -> float:
+    # P(X <= violations) for X ~ Bin(size, rate), summed in log space so that
+    # the binomial coefficients of large samples do not overflow a float
+    terms = [
+        math.lgamma(size + 1)
+        - math.lgamma(count + 1)
+        - math.lgamma(size - count + 1)
+        + count * math.log(rate)
+        + (size - count) * math.log1p(-rate)
+        for count in range(violations + 1)
+    ]
+    largest = max(terms)
+    return math.exp(largest) * math.fsum(math.exp(term - largest) for term in terms)
+
+
+def upper_bound(violations: int, size: int, confidence: float) -> float:
+    # exact one-sided binomial (Clopper-Pearson) bound, found by bisection
+    if violations >= size:
+        return 1.0
+    low, high = violations / size, 1.0
+    for _ in range(50):
+        rate = (low + high) / 2
+        if binomial_tail(violations, size, rate) > 1 - confidence:
+            low = rate
+        else:
+            high = rate
+    return high
+
+
+def run_sampled_check(cube, checks, size: int, seed: int, confidence: float) -> float:
+    observations, total = sample_observations(cube, size, seed)
+    violating = violating_observations(cube, observations)
+    # structures, data sets, slices and code lists are checked in full
+    for check, query in checks.items():
+        broken = bool(violating[check]) if check in violating else run_check(cube, query)
+        print(f"{broken} {check}")
+
+    sampled = len(observations)
+    violations = len(set().union(*violating.values()))
+    bound = upper_bound(violations, sampled, confidence) if sampled else 1.0
+    print(
+        f"Sampled {sampled} of {total} observations (seed {seed}), {violations} violating, "
+        f"violation rate below {bound:.2%} with {confidence:.0%} confidence"
+    )
+    return bound
+
+
+def load_cubes(paths: list[str]) -> list:
+    cubes = []
+    for path in paths:
+        cube = load_graph(path)
+        setattr(cube, "name", os.path.basename(path))
+        cubes.append(cube)
+    return cubes
 
 
 def main():
-    cubes = [care_providers.get_cube(), population.get_cube()]
+    parser = argparse.ArgumentParser(description="Check data cube integrity constraints")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="generated cubes to check, both cubes are rebuilt when omitted",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        metavar="N",
+        help="check observations on a random sample of N of them, the rest in full",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the sample")
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="confidence of the violation rate bound of a sample",
+    )
+    args = parser.parse_args()
+    if args.sample is not None and args.sample < 1:
+        parser.error("--sample needs at least one observation")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+
+    if args.files:
+        cubes = load_cubes(args.files)
+    else:
+        cubes = [care_providers.get_cube(), population.get_cube()]
+
     for cube in cubes:
         print(cube.name.upper())
-
-        # required bindings
-        cube.bind("rdf", "http://www.w3.org/1999/02/22-rdf-syntax-ns#")
-        cube.bind("rdfs", "http://www.w3.org/2000/01/rdf-schema#")
-        cube.bind("skos", "http://www.w3.org/2004/02/skos/core#")
-        cube.bind("qb", "http://purl.org/linked-data/cube#")
-        cube.bind("xsd", "http://www.w3.org/2001/XMLSchema#")
-        cube.bind("owl", "http://www.w3.org/2002/07/owl#")
+        bind_prefixes(cube)
 
         print("> True = constraint is broken")
-        run_qb_check(cube, queries)
+        if args.sample:
+            run_sampled_check(cube, queries, args.sample, args.seed, args.confidence)
+        else:
+            run_qb_check(cube, queries)
         print()
 
 
@@ -0,0 +1,131 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import socketserver
+import sys
+import time
+import traceback
+
+from rdflib import Graph
+
+from cubes import care_providers, codelist, population
+from cubes.sources import enable_cache
+from service.client import ROOT, SOCKET_PATH, receive_message, request, send_message
+
+# modules whose main() can be run by the client
+MODULES = [
+    "cubes.care_providers",
+    "cubes.population",
+    "cubes.provider_rates",
+    "cubes.contracts",
+    "vocabs.skos_hierarchy",
+    "vocabs.dcat_dataset",
+    "provenance",
+    "queries",
+]
+
+
+def warm_up() -> None:
+    # imports, rdflib plugins and the parsed sources stay in this process
+    for name in MODULES:
+        importlib.import_module(name)
+    enable_cache()
+    care_providers.load_data()
+    population.load_data()
+    codelist.load_index()
+    graph = Graph().parse(data="<urn:a> <urn:b> <urn:c> .", format="ttl")
+    graph.serialize(format="ttl")
+
+
+def run_module(name: str, args: list[str], cwd: str) -> tuple[int, str]:
+    if name not in MODULES:
+        return 2, f"Unknown module {name}, choose from {', '.join(MODULES)}\n"
+
+    # requests run one at a time, argv, stdout and the directory are process wide
+    output = io.StringIO()
+    argv, directory = sys.argv, os.getcwd()
+    status = 0
+    try:
+        os.chdir(cwd)
+        sys.argv = [name, *args]
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            importlib.import_module(name).main()
+    except SystemExit as error:
+        if isinstance(error.code, str):
+            output.write(error.code + "\n")
+            status = 1
+        else:
+            status = error.code or 0
+    except Exception:
+        output.write(traceback.format_exc())
+        status = 1
+    finally:
+        sys.argv = argv
+        os.chdir(directory)
+    return status, output.getvalue()
+
+
+class BuilderHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        message = receive_message(self.rfile)
+        if message is None:
+            return
+
+        start = time.perf_counter()
+        command = message.get("command")
+        if command == "run":
+            status, output = run_module(message["module"], message["args"], message["cwd"])
+        elif command == "status":
+            status, output = 0, f"Builder {os.getpid()} serving {', '.join(MODULES)}\n"
+        elif command == "stop":
+            status, output = 0, "Builder stopped\n"
+        else:
+            status, output = 2, f"Unknown command {command}\n"
+
+        send_message(self.connection, {"status": status, "output": output})
+        print(f"{command} {message.get('module', '')} -> {status} "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        if command == "stop":
+            self.server.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm builder listening on a Unix socket")
+    parser.add_argument(
+        "--socket",
+        default=SOCKET_PATH,
+        help="relative paths are resolved against the repository root",
+    )
+    args = parser.parse_args()
+    args.socket = os.path.join(ROOT, args.socket)
+
+    # the default sources are relative to the repository root
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    warm_up()
+    print(f"Warmed up in {time.perf_counter() - start:.2f}s")
+
+    if os.path.exists(args.socket):
+        try:
+            request({"command": "status"}, args.socket)
+            parser.exit(1, f"A builder is already listening on {args.socket}\n")
+        except ConnectionError:
+            # left behind by a killed builder, it blocks the bind
+            os.remove(args.socket)
+    os.makedirs(os.path.dirname(args.socket) or ".", exist_ok=True)
+    with socketserver.UnixStreamServer(args.socket, BuilderHandler) as server:
+        server.running = True
+        print(f"Listening on {args.socket}")
+        try:
+            while server.running:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
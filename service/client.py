@@ -0,0 +1,67 @@
+import json
+import os
+import socket
+import sys
+
+# only the standard library is imported, starting the client stays cheap
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# relative paths are resolved against the repository, not the working directory,
+# so the client finds the builder wherever either of them was started
+SOCKET_PATH = os.path.join(
+    ROOT, os.environ.get("NDBI046_BUILDER_SOCKET", os.path.join("out", "builder.sock"))
+)
+
+
+def send_message(connection: socket.socket, message: dict) -> None:
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def receive_message(file) -> dict | None:
+    line = file.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def request(message: dict, path: str = SOCKET_PATH) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        send_message(connection, message)
+        with connection.makefile("rb") as file:
+            response = receive_message(file)
+    if response is None:
+        raise ConnectionError("The builder closed the connection without a response")
+    return response
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print("usage: python -m service.client MODULE [ARGS ...] | --status | --stop")
+        print("runs MODULE (e.g. cubes.care_providers --rollup) in the warm builder")
+        sys.exit(0 if len(sys.argv) >= 2 else 2)
+
+    if sys.argv[1] in ("--status", "--stop"):
+        message = {"command": sys.argv[1][2:]}
+    else:
+        message = {
+            "command": "run",
+            "module": sys.argv[1],
+            "args": sys.argv[2:],
+            "cwd": os.getcwd(),
+        }
+
+    try:
+        response = request(message)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(
+            f"No builder listening on {SOCKET_PATH}, start it with python -m service.builder",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    sys.stdout.write(response.get("output", ""))
+    sys.exit(response.get("status", 0))
+
+
+if __name__ == "__main__":
+    main()
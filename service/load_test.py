@@ -0,0 +1,71 @@
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+
+DEFAULT_PATHS = [
+    "/population/observations?region=CZ010",
+    "/population/observations?county=CZ0100",
+    "/care_providers/observations?region=cz020",
+    "/population/sparql?"
+    + urlencode(
+        {
+            "query": "SELECT (COUNT(?obs) AS ?count) "
+            "WHERE { ?obs a <http://purl.org/linked-data/cube#Observation> }"
+        }
+    ),
+]
+
+
+def request(session: requests.Session, url: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    response = session.get(url, timeout=60)
+    return time.perf_counter() - start, response.status_code
+
+
+def run(base_url: str, paths: list[str], requests_count: int, workers: int) -> None:
+    urls = [base_url + paths[i % len(paths)] for i in range(requests_count)]
+    local = threading.local()
+
+    def worker(url: str) -> tuple[float, int]:
+        # one keep-alive session per thread
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return request(local.session, url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(worker, urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status != 200)
+    print(f"Requests: {len(results)}, errors: {errors}, workers: {workers}")
+    print(f"Total time: {elapsed:.2f}s, throughput: {len(results) / elapsed:.1f} req/s")
+    print(
+        f"Latency mean {statistics.mean(latencies) * 1000:.1f} ms, "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, "
+        f"max {latencies[-1] * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the cube query service")
+    parser.add_argument("--url", default="http://127.0.0.1:8046")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--path", action="append", help="request path, can be given multiple times"
+    )
+    args = parser.parse_args()
+
+    run(args.url, args.path or DEFAULT_PATHS, args.requests, args.workers)
+
+
+if __name__ == "__main__":
+    main()
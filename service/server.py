@@ -0,0 +1,231 @@
+import argparse
+import json
+import threading
+import time
+import traceback
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pyparsing import ParseException
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import QB, RDF
+from rdflib.plugins.sparql.algebra import translateQuery, traverse
+from rdflib.plugins.sparql.parser import parseQuery
+from rdflib.plugins.sparql.sparql import Query
+
+from cubes.snapshot import load_graph
+
+CUBES = {
+    "care_providers": "out/care_providers.ttl",
+    "population": "out/population.ttl",
+}
+
+CACHE_SIZE = 1024
+# observation properties that are not dimensions or measures
+SKIPPED = {RDF.type, QB.dataSet}
+
+
+def local_name(term) -> str:
+    return str(term).replace("#", "/").split("/")[-1]
+
+
+def term_value(term) -> any:
+    if isinstance(term, Literal):
+        return term.toPython()
+    if isinstance(term, URIRef):
+        return local_name(term)
+    return str(term)
+
+
+class CubeIndex:
+    def __init__(self, name: str, graph: Graph):
+        self.name = name
+        self.graph = graph
+        # observation id -> {property name: value}
+        self.observations = {}
+        # (property name, lowercase code) -> observation ids
+        self.by_value = {}
+
+        for observation in graph.subjects(RDF.type, QB.Observation):
+            key = local_name(observation)
+            row = {"observation": key}
+            for prop, value in graph.predicate_objects(observation):
+                if prop in SKIPPED:
+                    continue
+                prop_name = local_name(prop)
+                row[prop_name] = term_value(value)
+                if isinstance(value, URIRef):
+                    code = row[prop_name].lower()
+                    self.by_value.setdefault((prop_name, code), set()).add(key)
+            self.observations[key] = row
+
+    def lookup(self, filters: dict[str, str]) -> list[dict]:
+        keys = None
+        for prop, code in filters.items():
+            matching = self.by_value.get((prop, code.lower()), set())
+            keys = matching if keys is None else keys & matching
+        if keys is None:
+            keys = self.observations.keys()
+        return [self.observations[key] for key in sorted(keys)]
+
+
+class QueryError(ValueError):
+    pass
+
+
+def prepare_query(query: str) -> Query:
+    try:
+        prepared = translateQuery(parseQuery(query))
+    except ParseException as error:
+        raise QueryError(f"Invalid query: {error}") from error
+    except Exception as error:
+        # the algebra translation rejects queries that parse but are not valid
+        raise QueryError(f"Invalid query: {error}") from error
+
+    # rdflib fetches SERVICE endpoints and FROM graphs over the network
+    if prepared.algebra.get("datasetClause"):
+        raise QueryError("FROM and FROM NAMED are not supported")
+    services = []
+
+    def find_service(node):
+        if getattr(node, "name", None) == "ServiceGraphPattern":
+            services.append(node.term)
+
+    traverse(prepared.algebra, visitPre=find_service)
+    if services:
+        raise QueryError("SERVICE is not supported")
+    return prepared
+
+
+def load_cubes(paths: dict[str, str]) -> dict[str, CubeIndex]:
+    cubes = {}
+    for name, path in paths.items():
+        start = time.perf_counter()
+        graph = load_graph(path)
+        cubes[name] = CubeIndex(name, graph)
+        print(
+            f"Loaded {name} from {path}: {len(graph)} triples, "
+            f"{len(cubes[name].observations)} observations "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+    return cubes
+
+
+def create_handler(cubes: dict[str, CubeIndex], cache_size: int = CACHE_SIZE):
+    # the SPARQL parser is not thread safe, lookups do not need the lock
+    sparql_lock = threading.Lock()
+
+    # results are cached as encoded bodies, the graphs never change after startup
+    @lru_cache(maxsize=cache_size)
+    def run_sparql(cube: str, query: str) -> tuple[str, bytes]:
+        with sparql_lock:
+            result = cubes[cube].graph.query(prepare_query(query))
+            if result.type in ("CONSTRUCT", "DESCRIBE"):
+                return "text/turtle", result.serialize(format="turtle")
+            return "application/sparql-results+json", result.serialize(format="json")
+
+    @lru_cache(maxsize=cache_size)
+    def run_lookup(cube: str, filters: tuple[tuple[str, str], ...]) -> bytes:
+        rows = cubes[cube].lookup(dict(filters))
+        return json.dumps(rows, ensure_ascii=False, default=str).encode("utf-8")
+
+    class CubeRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately, avoid delayed ACK stalls
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self.dispatch(url.path, params)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode("utf-8")
+            if self.headers.get("Content-Type", "").startswith("application/sparql-query"):
+                params["query"] = body
+            else:
+                params.update(
+                    {key: values[0] for key, values in parse_qs(body).items()}
+                )
+            self.dispatch(url.path, params)
+
+        def dispatch(self, path: str, params: dict[str, str]) -> None:
+            parts = [part for part in path.split("/") if part]
+
+            if not parts:
+                listing = {
+                    name: len(cube.observations) for name, cube in cubes.items()
+                }
+                self.send(200, "application/json", json.dumps(listing).encode())
+                return
+
+            if len(parts) != 2 or parts[0] not in cubes:
+                self.send(404, "text/plain", b"Unknown cube or endpoint\n")
+                return
+
+            cube, endpoint = parts
+            try:
+                if endpoint == "sparql":
+                    if "query" not in params:
+                        self.send(400, "text/plain", b"Missing query parameter\n")
+                        return
+                    content_type, body = run_sparql(cube, params["query"])
+                    self.send(200, content_type, body)
+                elif endpoint == "observations":
+                    filters = tuple(sorted(params.items()))
+                    self.send(200, "application/json", run_lookup(cube, filters))
+                else:
+                    self.send(404, "text/plain", b"Unknown endpoint\n")
+            except QueryError as error:
+                self.send(400, "text/plain", f"{error}\n".encode("utf-8"))
+            except Exception:
+                traceback.print_exc()
+                self.send(500, "text/plain", b"Internal server error\n")
+
+        def send(self, status: int, content_type: str, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return CubeRequestHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only query service for data cubes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8046)
+    parser.add_argument(
+        "--cube",
+        action="append",
+        metavar="NAME=PATH",
+        help="cube to serve, defaults to the cubes generated into out/",
+    )
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+
+    paths = CUBES
+    if args.cube:
+        paths = dict(cube.split("=", 1) for cube in args.cube)
+
+    cubes = load_cubes(paths)
+    server = ThreadingHTTPServer(
+        (args.host, args.port), create_handler(cubes, args.cache_size)
+    )
+    print(f"Serving {', '.join(cubes)} on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from rdflib.namespace import QB, RDF
+
+from cubes.store import create_graph
+from service.client import ROOT, SOCKET_PATH, request
+
+
+def test_default_socket_is_in_repository():
+    assert os.path.isabs(SOCKET_PATH)
+    assert os.path.dirname(SOCKET_PATH) == os.path.join(ROOT, "out")
+
+
+@pytest.fixture
+def builder(tmp_path):
+    socket = str(tmp_path / "builder.sock")
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "NDBI046_BUILDER_SOCKET": socket,
+        "NDBI046_SNAPSHOT_KEY": str(tmp_path / "snapshot.key"),
+    }
+    # started outside of the repository, unlike the client below
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "service.builder"],
+        cwd=tmp_path,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            request({"command": "status"}, socket)
+            break
+        except (FileNotFoundError, ConnectionError):
+            if daemon.poll() is not None or time.monotonic() > deadline:
+                daemon.kill()
+                pytest.fail("The builder did not start")
+            time.sleep(0.1)
+    yield env
+    if daemon.poll() is None:
+        request({"command": "stop"}, socket)
+    daemon.wait(timeout=10)
+
+
+def test_build_through_builder(tmp_path, builder):
+    work = tmp_path / "work"
+    work.mkdir()
+    os.symlink(os.path.join(ROOT, "data"), work / "data")
+
+    result = subprocess.run(
+        [sys.executable, "-m", "service.client", "cubes.population"],
+        cwd=work,
+        env=builder,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Generated data cube into out/population.ttl" in result.stdout
+    graph = create_graph()
+    graph.parse(work / "out" / "population.ttl", format="ttl")
+    assert any(graph.subjects(RDF.type, QB.Observation))
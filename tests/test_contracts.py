@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from cubes import contracts
+
+
+def create_register(rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "OkresCode": ["CZ0100"] * rows,
+            "Okres": ["Praha"] * rows,
+            "KrajCode": ["CZ010"] * rows,
+            "Kraj": ["Hlavní město Praha"] * rows,
+            "OborPece": ["všeobecné praktické lékařství"] * rows,
+            "Ico": np.arange(rows),
+            "DruhZarizeni": ["Samostatná ordinace"] * rows,
+            "PravniFormaKod": [101] * rows,
+        }
+    )
+
+
+def test_incomplete_rows_are_allowed():
+    # rows the cleaning drops, the integer columns become floats
+    register = create_register()
+    register.loc[:1, ["KrajCode", "Ico", "PravniFormaKod"]] = None
+    assert register["Ico"].dtype.kind == "f"
+    assert contracts.check_columns("register", register, contracts.REGISTER) == []
+
+
+def test_mostly_empty_column_fails():
+    register = create_register()
+    register.loc[:49, "KrajCode"] = None
+    problems = contracts.check_columns("register", register, contracts.REGISTER)
+    assert problems == ["register: column KrajCode is 50.00% empty, at most 5.00% allowed"]
+
+
+def test_wrong_dtype_fails():
+    register = create_register().assign(Ico="12345678x")
+    problems = contracts.check_columns("register", register, contracts.REGISTER)
+    assert len(problems) == 1 and "column Ico has dtype" in problems[0]
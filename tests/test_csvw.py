@@ -0,0 +1,101 @@
+import csv
+import json
+import re
+from urllib.parse import quote
+
+import pandas as pd
+from rdflib import Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import QB, RDF, XSD
+
+from cubes import care_providers
+from cubes.codelist import CountyIndex
+from cubes.csvw import csvw_metadata_path, write_csvw
+
+PREFIXES = {"rdf": str(RDF), "qb": str(QB)}
+RESERVED = ":/?#[]@!$&'()*+,;=%"
+
+
+def expand(template: str, row: dict) -> URIRef:
+    # RFC 6570 simple and reserved expansion, all the templates of the metadata use,
+    # expanded into an IRI, so letters outside of ASCII are kept
+    def replace(match):
+        if match.group(1):
+            return "".join(
+                char if ord(char) > 127 else quote(char, safe=RESERVED)
+                for char in row[match.group(2)]
+            )
+        return quote(row[match.group(2)], safe="")
+
+    prefix, _, name = template.partition(":")
+    if prefix in PREFIXES:
+        return URIRef(PREFIXES[prefix] + name)
+    return URIRef(re.sub(r"\{(\+?)(\w+)\}", replace, template))
+
+
+def csv2rdf(path: str) -> Graph:
+    # minimal mode of CSV on the Web to RDF, enough for the observation tables
+    with open(csvw_metadata_path(path), encoding="utf-8") as file:
+        schema = json.load(file)["tableSchema"]
+    graph = Graph()
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            subject = expand(schema["aboutUrl"], row)
+            for column in schema["columns"]:
+                if column.get("suppressOutput"):
+                    continue
+                predicate = expand(column["propertyUrl"], row)
+                if "valueUrl" in column:
+                    value = expand(column["valueUrl"], row)
+                else:
+                    value = Literal(row[column["name"]], datatype=XSD[column["datatype"]])
+                graph.add((subject, predicate, value))
+    return graph
+
+
+def create_register() -> pd.DataFrame:
+    rows = [
+        ("CZ0100", "CZ010", "obor péče 0, varianta", 1, "A", 100),
+        ("CZ0100", "CZ010", "obor péče 0, varianta", 2, "A", 100),
+        ("CZ0100", "CZ010", "všeobecné praktické lékařství", 3, "B", 112),
+        ("CZ0201", "CZ020", "obor péče 0, varianta", 4, "B", 101),
+    ]
+    return pd.DataFrame(
+        rows,
+        columns=[
+            care_providers.COUNTY_CODE,
+            care_providers.REGION_CODE,
+            care_providers.FIELD_OF_CARE,
+            care_providers.PROVIDER,
+            care_providers.FACILITY_TYPE,
+            care_providers.LEGAL_FORM,
+        ],
+    )
+
+
+def create_codelist() -> CountyIndex:
+    counties = {
+        "CZ0100": {"lau": 40100, "label": "Praha", "region": "CZ010"},
+        "CZ0201": {"lau": 40201, "label": "Benešov", "region": "CZ020"},
+    }
+    return CountyIndex(counties, {"CZ010": "Praha", "CZ020": "Středočeský kraj"})
+
+
+def test_csvw_matches_turtle(tmp_path):
+    frame = care_providers.create_frame(create_register(), create_codelist())
+    path = str(tmp_path / "care_providers.csv")
+    write_csvw(
+        frame,
+        path,
+        care_providers.NSR.careProvidersDataCubeInstance,
+        care_providers.serialize_to_string,
+    )
+
+    cube = frame.to_graph()
+    observations = Graph()
+    for observation in cube.subjects(RDF.type, QB.Observation):
+        for triple in cube.triples((observation, None, None)):
+            observations.add(triple)
+
+    assert len(observations) > 0
+    assert isomorphic(csv2rdf(path), observations)
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+from rdflib import Graph
+from rdflib.namespace import QB, RDF
+
+pytest.importorskip("airflow")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "dags"))
+
+from operators import artifacts, care_providers  # noqa: E402
+
+
+def test_shards_split_the_observations(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "ARTIFACTS_PATH", str(tmp_path / "artifacts"))
+    rows = [
+        ("Praha", "CZ0100", "Hlavní město Praha", "CZ010", "obor péče 0, varianta"),
+        ("Praha", "CZ0100", "Hlavní město Praha", "CZ010", "obor péče 0, varianta"),
+        ("Praha", "CZ0100", "Hlavní město Praha", "CZ010", "všeobecné lékařství"),
+        ("Benešov", "CZ0201", "Středočeský kraj", "CZ020", "obor péče 0, varianta"),
+        ("Beroun", "CZ0202", "Středočeský kraj", "CZ020", "všeobecné lékařství"),
+    ]
+    data_file = str(tmp_path / "providers.csv")
+    pd.DataFrame(rows, columns=["Okres", "OkresCode", "Kraj", "KrajCode", "OborPece"]).to_csv(
+        data_file
+    )
+
+    partitions = care_providers.partition_care_providers(data_file)
+    assert [partition["region"] for partition in partitions] == ["CZ010", "CZ020"]
+
+    shards = [care_providers.create_care_providers_shard(**kwargs) for kwargs in partitions]
+    observations = [
+        set(Graph().parse(shard, format="nt").subjects(RDF.type, QB.Observation))
+        for shard in shards
+    ]
+    # every group is in exactly one shard, under the id of the partition task
+    assert len(observations[0]) == 2 and len(observations[1]) == 2
+    assert not observations[0] & observations[1]
+    assert sorted(str(obs).split("/")[-1] for obs in observations[0] | observations[1]) == [
+        f"observation-{index:04d}" for index in range(4)
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("airflow")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "dags"))
+
+from operators import download  # noqa: E402
+
+CONTENT = bytes(range(256)) * (5 * 4096 + 7)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    # a stand-in for the register server, serves CONTENT in byte ranges when allowed
+    ranges = True
+    served = []
+
+    def log_message(self, *args):
+        pass
+
+    def send_content_headers(self, length: int) -> None:
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_content_headers(len(CONTENT))
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        if not self.ranges or header is None:
+            self.send_response(200)
+            self.send_content_headers(len(CONTENT))
+            self.wfile.write(CONTENT)
+            self.served.append(len(CONTENT))
+            return
+        start, end = header.removeprefix("bytes=").split("-")
+        body = CONTENT[int(start) : int(end) + 1]
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+        self.send_content_headers(len(body))
+        self.wfile.write(body)
+        self.served.append(len(body))
+
+
+@pytest.fixture
+def server():
+    RangeHandler.ranges = True
+    RangeHandler.served = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/register.csv"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_ranged_download(tmp_path, server):
+    path = str(tmp_path / "register.csv")
+    assert len(CONTENT) > download.MIN_PART_SIZE
+
+    assert asyncio.run(download.download(server, path, parts=4, retries=0)) == len(CONTENT)
+    with open(path, "rb") as file:
+        assert file.read() == CONTENT
+    assert len(RangeHandler.served) == 4
+    assert not [name for name in os.listdir(tmp_path) if ".part" in name]
+
+
+def test_ranged_download_resumes(tmp_path, server):
+    path = str(tmp_path / "register.csv")
+    # an earlier attempt saved the first 1000 bytes of the second part
+    start = len(CONTENT) // 4
+    with open(f"{path}.{len(CONTENT)}.part1", "wb") as file:
+        file.write(CONTENT[start : start + 1000])
+
+    asyncio.run(download.download(server, path, parts=4, retries=0))
+    with open(path, "rb") as file:
+        assert file.read() == CONTENT
+    assert sum(RangeHandler.served) == len(CONTENT) - 1000
+
+
+def test_download_without_ranges(tmp_path, server):
+    RangeHandler.ranges = False
+    path = str(tmp_path / "register.csv.gz")
+
+    asyncio.run(download.download(server, path, parts=4, retries=0))
+    # plain content is compressed on the way to a .gz name
+    with gzip.open(path, "rb") as file:
+        assert file.read() == CONTENT
+    assert RangeHandler.served == [len(CONTENT)]
@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from cubes.frame import CubeFrame
+from cubes.partitions import filter_regions
+
+
+def create_frame() -> CubeFrame:
+    columns = pd.DataFrame(
+        {
+            "county": ["CZ0100", "CZ0201", "CZ0202"],
+            "region": ["CZ010", "CZ020", "CZ020"],
+            "mean_population": [1275406, 99770, 95543],
+        }
+    )
+    return CubeFrame(columns, ["county", "region"], ["mean_population"])
+
+
+def test_filter_regions_ignores_case():
+    frame = filter_regions(create_frame(), ["cz020"])
+
+    assert sorted(frame.columns["county"]) == ["CZ0201", "CZ0202"]
+
+
+def test_filter_regions_rejects_unknown_codes():
+    with pytest.raises(ValueError, match="CZ999"):
+        filter_regions(create_frame(), ["CZ010", "cz999"])
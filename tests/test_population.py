@@ -0,0 +1,38 @@
+from rdflib.namespace import QB, RDF
+
+from cubes import population
+from vocabs import dcat_dataset
+
+SOURCE = population.SOURCES_POPULATION[0]
+
+
+def observations(cube) -> list[str]:
+    return sorted(
+        str(observation).split("/")[-1]
+        for observation in cube.subjects(RDF.type, QB.Observation)
+    )
+
+
+def test_single_year_keeps_observation_names():
+    cube = population.create_datacube(population.load_data(), population.load_codelist())
+
+    assert observations(cube)[0] == "observation-0001"
+    assert set(cube.objects(None, population.NS.ref_period)) == {population.YEAR["2021"]}
+
+
+def test_years(tmp_path):
+    # the same counties a year earlier
+    with open(SOURCE, "rb") as file:
+        content = file.read()
+    earlier = tmp_path / "130141-21data2020.csv"
+    earlier.write_bytes(content.replace(b",2021,", b",2020,"))
+
+    data = population.load_data([str(earlier), SOURCE])
+    cube = population.create_datacube(data, population.load_codelist())
+    names = observations(cube)
+    assert names[0] == "observation-2020-0001"
+    assert len([name for name in names if name.startswith("observation-2021-")]) == 77
+
+    path = str(tmp_path / "population.ttl")
+    cube.serialize(path, format="ttl")
+    assert dcat_dataset.read_years(path) == ["2020", "2021"]
@@ -0,0 +1,117 @@
+import math
+from fractions import Fraction
+
+from rdflib import Graph, Namespace
+
+import queries
+
+NS = Namespace("https://milan252525.github.io/ontology#")
+NSR = Namespace("https://milan252525.github.io/resources/")
+
+PREFIXES = """
+@prefix qb: <http://purl.org/linked-data/cube#> .
+@prefix ns: <https://milan252525.github.io/ontology#> .
+@prefix nsr: <https://milan252525.github.io/resources/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+"""
+
+# the components use qb:dimension and qb:measure, like the generated cubes
+STRUCTURE = """
+ns:county a qb:DimensionProperty, qb:CodedProperty .
+ns:mean_population a qb:MeasureProperty .
+
+ns:structure a qb:DataStructureDefinition ;
+    qb:component [ qb:dimension ns:county ], [ qb:measure ns:mean_population ] .
+
+nsr:dataCubeInstance a qb:DataSet ;
+    qb:structure ns:structure .
+"""
+
+
+def create_cube(counties: list[str | None]) -> Graph:
+    cube = Graph().parse(data=PREFIXES + STRUCTURE, format="ttl")
+    for index, county in enumerate(counties):
+        observation = f"nsr:observation-{index:04d}"
+        triples = f"{observation} a qb:Observation ; qb:dataSet nsr:dataCubeInstance ; "
+        if county is not None:
+            triples += f"ns:county nsr:{county} ; "
+        triples += f'ns:mean_population "{1000 + index}"^^xsd:integer .'
+        cube.parse(data=PREFIXES + triples, format="ttl")
+    queries.bind_prefixes(cube)
+    return cube
+
+
+def test_valid_cube_passes():
+    cube = create_cube(["CZ0100", "CZ0201", "CZ0202"])
+    assert not queries.run_check(cube, queries.queries["All dimensions required"])
+    assert not queries.has_duplicate_observations(cube)
+    assert queries.run_sampled_check(cube, queries.queries, 2, 0, 0.95) < 1
+
+
+def test_missing_dimension_fails():
+    # every observation lacks its county, declared through qb:dimension
+    cube = create_cube([None] * 20)
+    assert queries.run_check(cube, queries.queries["All dimensions required"])
+
+    observations, total = queries.sample_observations(cube, 5, 0)
+    assert len(observations) == 5 and total == 20
+    violating = queries.violating_observations(cube, observations)
+    assert violating["All dimensions required"] == set(observations)
+    assert queries.run_sampled_check(cube, queries.queries, 5, 0, 0.95) == 1.0
+
+
+def test_duplicates_fail():
+    cube = create_cube(["CZ0100", "CZ0100", "CZ0201"])
+    assert queries.has_duplicate_observations(cube)
+
+    observations, _ = queries.sample_observations(cube, 3, 0)
+    duplicated = queries.duplicated_observations(cube, observations)
+    assert len(duplicated) == 2
+
+
+def test_duplicates_need_all_dimensions_equal():
+    # the observations share the county but not the second dimension
+    cube = create_cube(["CZ0100", "CZ0100"])
+    cube.parse(
+        data=PREFIXES
+        + """
+        ns:field a qb:DimensionProperty .
+        ns:structure qb:component [ qb:dimension ns:field ] .
+        nsr:observation-0000 ns:field nsr:b .
+        nsr:observation-0001 ns:field nsr:a .
+        """,
+        format="ttl",
+    )
+    assert not queries.has_duplicate_observations(cube)
+
+    cube.set((NSR["observation-0001"], NS.field, NSR.b))
+    assert queries.has_duplicate_observations(cube)
+
+
+def test_observation_query_values():
+    values = "VALUES ?obs { <urn:a> }"
+    query = queries.observation_query(queries.ALL_DIM, values)
+    assert query.lstrip().startswith("SELECT DISTINCT ?obs WHERE {")
+    assert values in query
+    assert queries.observation_query(queries.ALL_DIM).lstrip().startswith("ASK {")
+    assert "$" not in queries.observation_query(queries.ALL_DIM)
+
+
+def test_upper_bound():
+    # closed form of the bound without any violations
+    assert abs(queries.upper_bound(0, 300, 0.95) - (1 - 0.05 ** (1 / 300))) < 1e-9
+
+
+def test_upper_bound_large_sample():
+    # the binomial coefficients of these samples do not fit into a float
+    bound = queries.upper_bound(600, 2000, 0.95)
+    rate = 600 / 2000
+    assert rate < bound < rate + 2 * math.sqrt(rate * (1 - rate) / 2000)
+
+    # the tail at the bound is exactly 1 - confidence, checked with exact fractions
+    bound = Fraction(queries.upper_bound(40, 1200, 0.95))
+    tail = sum(
+        math.comb(1200, count) * bound**count * (1 - bound) ** (1200 - count)
+        for count in range(41)
+    )
+    assert abs(float(tail) - 0.05) < 1e-9
@@ -0,0 +1,151 @@
+import pandas as pd
+import pytest
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import XSD
+
+from cubes import care_providers, population, provider_rates
+from cubes.codelist import CountyIndex
+from cubes.reader import TurtleParser, read_cube
+
+MODIFIED = pd.Timestamp("2026-10-19").date()
+
+
+def create_register() -> pd.DataFrame:
+    rows = [
+        ("CZ0100", "CZ010", "obor péče 0, varianta", 1, "A", 100),
+        ("CZ0100", "CZ010", "obor péče 0, varianta", 2, "A", 100),
+        ("CZ0100", "CZ010", "všeobecné praktické lékařství", 3, "B", 112),
+        ("CZ0201", "CZ020", "obor péče 0, varianta", 4, "B", 101),
+    ]
+    return pd.DataFrame(
+        rows,
+        columns=[
+            care_providers.COUNTY_CODE,
+            care_providers.REGION_CODE,
+            care_providers.FIELD_OF_CARE,
+            care_providers.PROVIDER,
+            care_providers.FACILITY_TYPE,
+            care_providers.LEGAL_FORM,
+        ],
+    )
+
+
+def create_population() -> pd.DataFrame:
+    rows = [
+        ("DEM0004", 101, 40100, "Praha", 2021, 1275406),
+        ("DEM0004", 101, 40201, "Benešov", 2021, 99770),
+        ("DEM0004", 101, 40100, "Praha", 2020, 1324277),
+        ("DEM0004", 101, 40201, "Benešov", 2020, 99391),
+    ]
+    data = pd.DataFrame(
+        rows, columns=["vuk", "vuzemi_cis", "vuzemi_kod", "vuzemi_txt", "rok", "hodnota"]
+    )
+    data.index = data["rok"].astype(str) + "-" + data.index.astype(str).str.zfill(4)
+    return data
+
+
+def create_codelist() -> CountyIndex:
+    counties = {
+        "CZ0100": {"lau": 40100, "label": "Praha", "region": "CZ010"},
+        "CZ0201": {"lau": 40201, "label": "Benešov", "region": "CZ020"},
+    }
+    return CountyIndex(counties, {"CZ010": "Praha", "CZ020": "Středočeský kraj"})
+
+
+def build_cube(name: str) -> Graph:
+    codelist = create_codelist()
+    if name == "care_providers":
+        return care_providers.create_datacube(
+            create_register(), codelist, rollup=True, modified=MODIFIED
+        )
+    if name == "population":
+        return population.create_datacube(create_population(), codelist, MODIFIED)
+    return provider_rates.create_datacube(
+        create_register(), create_population(), codelist, MODIFIED
+    )
+
+
+def to_term(value):
+    if isinstance(value, tuple):
+        lexical, datatype, language = value
+        # plain literals are xsd:string, rdflib keeps them without a datatype
+        if datatype == str(XSD.string):
+            datatype = None
+        return Literal(lexical, lang=language, datatype=datatype)
+    if value.startswith("_:"):
+        return BNode(value[2:])
+    return URIRef(value)
+
+
+def parse(path: str) -> Graph:
+    graph = Graph()
+    with open(path, encoding="utf-8") as file:
+        for triple in TurtleParser(file).triples():
+            graph.add(tuple(to_term(term) for term in triple))
+    return graph
+
+
+@pytest.mark.parametrize("name", ["care_providers", "population", "provider_rates"])
+@pytest.mark.parametrize("format", ["ttl", "nt"])
+def test_parser_matches_rdflib(tmp_path, name, format):
+    path = str(tmp_path / f"{name}.{format}")
+    build_cube(name).serialize(path, format=format, encoding="utf-8")
+
+    expected = Graph().parse(path, format=format)
+    assert len(expected) > 0
+    assert isomorphic(parse(path), expected)
+
+
+@pytest.mark.parametrize("name", ["care_providers", "population", "provider_rates"])
+def test_read_cube_matches_rdflib(tmp_path, name):
+    path = str(tmp_path / f"{name}.ttl")
+    build_cube(name).serialize(path, format="ttl", encoding="utf-8")
+    cube = Graph().parse(path, format="ttl")
+
+    frame = read_cube(path)
+    observations = {
+        str(subject).split("/")[-1]: subject
+        for subject in cube.subjects(
+            URIRef("http://www.w3.org/1999/02/22-rdf-syntax-ns#type"),
+            URIRef("http://purl.org/linked-data/cube#Observation"),
+        )
+    }
+    assert sorted(frame.index) == sorted(observations)
+    for name, row in frame.iterrows():
+        values = {
+            str(predicate).split("#")[-1]: value
+            for predicate, value in cube.predicate_objects(observations[name])
+        }
+        for column, value in row.items():
+            if pd.isna(value):
+                assert column not in values
+            elif isinstance(values[column], Literal):
+                assert float(values[column]) == pytest.approx(value)
+            else:
+                assert str(values[column]).split("/")[-1] == value
+
+
+def test_read_cube_in_any_order(tmp_path):
+    # N-Triples can list the values of a subject before its type
+    ns = "https://milan252525.github.io/ontology#"
+    nsr = "https://milan252525.github.io/resources/"
+    qb = "http://purl.org/linked-data/cube#"
+    rdf_type = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+    lines = [
+        f"<{ns}component> <{qb}dimension> <{ns}region> .",
+        f"<{ns}component> <{qb}measure> <{ns}mean_population> .",
+        f"<{nsr}observation-0001> <{ns}region> <{nsr}CZ010> .",
+        f'<{nsr}observation-0001> <{ns}mean_population> "5"^^<{XSD.integer}> .',
+        f"<{nsr}observation-0001> {rdf_type} <{qb}Observation> .",
+        f"<{nsr}slice-region-CZ020> <{ns}region> <{nsr}CZ020> .",
+        f"<{nsr}slice-region-CZ020> {rdf_type} <{qb}Slice> .",
+        f"<{nsr}slice-region-CZ020> <{qb}observation> <{nsr}observation-0001> .",
+    ]
+    path = tmp_path / "cube.nt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    frame = read_cube(str(path))
+    assert list(frame.index) == ["observation-0001"]
+    assert frame.loc["observation-0001", "region"] == "CZ010"
+    assert frame.loc["observation-0001", "mean_population"] == 5
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from rdflib.namespace import QB
+
+from cubes import care_providers
+from cubes.codelist import CountyIndex
+from cubes.store import create_graph
+
+COUNTIES = {
+    "CZ0100": {"lau": 40100, "label": "Praha", "region": "CZ010"},
+    "CZ0201": {"lau": 40201, "label": "Benešov", "region": "CZ020"},
+    "CZ0202": {"lau": 40202, "label": "Beroun", "region": "CZ020"},
+}
+REGIONS = {"CZ010": "Praha", "CZ020": "Středočeský kraj"}
+
+
+def create_register(counties: list[str]) -> pd.DataFrame:
+    rows = [
+        (county, COUNTIES[county]["region"], "zubní lékařství", 1, "A", 101)
+        for county in counties
+    ]
+    return pd.DataFrame(
+        rows,
+        columns=[
+            care_providers.COUNTY_CODE,
+            care_providers.REGION_CODE,
+            care_providers.FIELD_OF_CARE,
+            care_providers.PROVIDER,
+            care_providers.FACILITY_TYPE,
+            care_providers.LEGAL_FORM,
+        ],
+    )
+
+
+def total(cube, dataset) -> int:
+    return sum(
+        int(cube.value(observation, care_providers.NS.number_of_care_providers))
+        for observation in cube.subjects(QB.dataSet, dataset)
+    )
+
+
+def test_rollups_add_up():
+    register = create_register(["CZ0100", "CZ0201", "CZ0201", "CZ0202"])
+    codelist = CountyIndex(COUNTIES, REGIONS)
+    cube = care_providers.create_datacube(register, codelist, rollup=True)
+
+    assert total(cube, care_providers.NSR.careProvidersDataCubeInstance) == 4
+    assert total(cube, care_providers.NSR.careProvidersRegionDataCubeInstance) == 4
+    assert total(cube, care_providers.NSR.careProvidersCountryDataCubeInstance) == 4
+
+
+def test_unmapped_county_fails():
+    register = create_register(["CZ0100", "CZ0202"])
+    columns = care_providers.create_frame(register, CountyIndex(COUNTIES, REGIONS)).columns
+    # e.g. a code list index built before the county appeared in the register
+    codelist = CountyIndex({"CZ0100": COUNTIES["CZ0100"]}, REGIONS)
+
+    cube = create_graph()
+    dimensions = care_providers.add_dimensions(cube)
+    measures = care_providers.add_measures(cube, ["number_of_care_providers"])
+    with pytest.raises(ValueError, match="CZ0202"):
+        care_providers.create_rollups(cube, columns, codelist, dimensions, measures)
+
+
+def test_frame_rollup_skips_distinct_counts():
+    # the same provider in two counties of a region is a single distinct provider
+    register = create_register(["CZ0100", "CZ0201", "CZ0202"])
+    codelist = CountyIndex(COUNTIES, REGIONS)
+    frame = care_providers.create_frame(register, codelist, measures=care_providers.MEASURES)
+
+    regions = frame.rollup(["region"])
+    assert regions.measures == ["number_of_care_providers"]
+    assert regions.columns.set_index("region")["number_of_care_providers"].to_dict() == {
+        "CZ010": 1,
+        "CZ020": 2,
+    }
+
+    distinct = care_providers.create_frame(register, codelist, measures=["number_of_providers"])
+    with pytest.raises(ValueError):
+        distinct.rollup(["region"])
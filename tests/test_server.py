@@ -0,0 +1,127 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import pytest
+from rdflib import Literal, Namespace
+from rdflib.namespace import QB, RDF
+
+from cubes.store import create_graph
+from service.server import CubeIndex, create_handler
+
+NS = Namespace("https://example.org/resources/")
+NSP = Namespace("https://example.org/ontology#")
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    # a stand-in for a remote SPARQL endpoint, records every request it gets
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        self.send_response(500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_POST = do_GET
+
+
+def serve(handler) -> tuple[ThreadingHTTPServer, str]:
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+@pytest.fixture
+def cubes():
+    graph = create_graph()
+    observation = NS["observation-0001"]
+    graph.add((observation, RDF.type, QB.Observation))
+    graph.add((observation, NSP.county, NS["county/CZ0100"]))
+    graph.add((observation, NSP.numberOfCareProviders, Literal(3)))
+    return {"care_providers": CubeIndex("care_providers", graph)}
+
+
+@pytest.fixture
+def service(cubes):
+    httpd, url = serve(create_handler(cubes))
+    yield url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def remote():
+    RecordingHandler.requests = []
+    httpd, url = serve(RecordingHandler)
+    yield url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(url: str) -> tuple[int, bytes]:
+    try:
+        with urlopen(url) as response:
+            return response.status, response.read()
+    except HTTPError as error:
+        return error.code, error.read()
+
+
+def sparql(service: str, query: str) -> tuple[int, bytes]:
+    return get(f"{service}/care_providers/sparql?{urlencode({'query': query})}")
+
+
+def test_sparql_query(service):
+    status, body = sparql(service, f"SELECT ?s WHERE {{ ?s a <{QB.Observation}> }}")
+
+    assert status == 200
+    assert len(json.loads(body)["results"]["bindings"]) == 1
+
+
+def test_invalid_query_is_rejected(service):
+    status, _ = sparql(service, "SELECT WHERE {")
+
+    assert status == 400
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "SELECT * WHERE {{ SERVICE <{url}/sparql> {{ ?s ?p ?o }} }}",
+        "SELECT * WHERE {{ ?s ?p ?o OPTIONAL {{ SERVICE SILENT <{url}/sparql> {{ ?s ?q ?x }} }} }}",
+        "SELECT * FROM <{url}/graph.ttl> WHERE {{ ?s ?p ?o }}",
+        "ASK FROM NAMED <{url}/graph.ttl> {{ GRAPH ?g {{ ?s ?p ?o }} }}",
+    ],
+)
+def test_remote_data_is_rejected(service, remote, template):
+    status, _ = sparql(service, template.format(url=remote))
+
+    assert status == 400
+    assert RecordingHandler.requests == []
+
+
+def test_server_failure_is_reported(cubes, service):
+    def failing_query(*args, **kwargs):
+        raise RuntimeError("store is broken")
+
+    cubes["care_providers"].graph.query = failing_query
+    status, body = sparql(service, "ASK { ?s ?p ?o }")
+
+    assert status == 500
+    assert b"store is broken" not in body
+
+
+def test_lookup_failure_is_reported(cubes, service):
+    def failing_lookup(filters):
+        raise RuntimeError("index is broken")
+
+    cubes["care_providers"].lookup = failing_lookup
+    status, _ = get(f"{service}/care_providers/observations?county=CZ0100")
+
+    assert status == 500
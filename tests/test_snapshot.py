@@ -0,0 +1,61 @@
+import os
+import pickle
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import QB, RDF
+
+from cubes import snapshot
+from cubes.store import create_graph
+
+OBSERVATION = URIRef("https://milan252525.github.io/resources/observation-0000")
+UNPICKLED = []
+
+
+class Payload:
+    # records being unpickled instead of running anything harmful
+    def __reduce__(self):
+        return UNPICKLED.append, (True,)
+
+
+def create_cube(path: str):
+    cube = create_graph()
+    cube.add((OBSERVATION, RDF.type, QB.Observation))
+    cube.add((OBSERVATION, QB.dataSet, Literal(1)))
+    cube.serialize(path, format="ttl")
+    return cube
+
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setenv("NDBI046_SNAPSHOT_KEY", str(tmp_path / "key"))
+    path = str(tmp_path / "cube.ttl")
+    cube = create_cube(path)
+
+    assert snapshot.write_snapshot(cube, path) == snapshot.snapshot_path(path)
+    assert set(snapshot.read_snapshot(path)) == set(cube)
+
+
+def test_foreign_snapshot_is_not_unpickled(tmp_path, monkeypatch):
+    monkeypatch.setenv("NDBI046_SNAPSHOT_KEY", str(tmp_path / "key"))
+    path = str(tmp_path / "cube.ttl")
+    cube = create_cube(path)
+    snapshot.write_snapshot(cube, path)
+
+    # a snapshot shipped with a downloaded cube, signed with another key
+    with open(snapshot.snapshot_path(path), "rb") as file:
+        header, signature, _ = file.read().split(b"\n", 2)
+    with open(snapshot.snapshot_path(path), "wb") as file:
+        file.write(header + b"\n" + signature + b"\n" + pickle.dumps(Payload()))
+
+    assert set(snapshot.load_graph(path)) == set(cube)
+    assert not UNPICKLED
+
+
+def test_unwritable_snapshot_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv("NDBI046_SNAPSHOT_KEY", str(tmp_path / "key"))
+    path = str(tmp_path / "cube.ttl")
+    cube = create_cube(path)
+    # the temporary file cannot be created, like in a read-only directory
+    os.mkdir(snapshot.snapshot_path(path) + ".tmp")
+
+    assert snapshot.write_snapshot(cube, path) is None
+    assert set(snapshot.load_graph(path)) == set(cube)
@@ -0,0 +1,60 @@
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import QB, RDF, SKOS, XSD
+from rdflib.plugins.stores.memory import Memory
+
+from cubes.store import create_graph
+
+NS = Namespace("https://milan252525.github.io/ontology#")
+NSR = Namespace("https://milan252525.github.io/resources/")
+
+PATTERNS = [
+    (None, None, None),
+    (NSR["observation-0000"], None, None),
+    (None, RDF.type, QB.Observation),
+    (None, NS.county, NSR.cz0100),
+    (None, NS.number_of_care_providers, None),
+    (None, None, NSR.cz0100),
+]
+
+
+def add_cube(graph: Graph) -> None:
+    graph.add((NSR.cz0100, SKOS.prefLabel, Literal("Praha", lang="cs")))
+    for index, county in enumerate(["cz0100", "cz0201", "cz0100"]):
+        observation = NSR["observation-" + str(index).zfill(4)]
+        graph.add((observation, RDF.type, QB.Observation))
+        graph.add((observation, QB.dataSet, NSR.careProvidersDataCubeInstance))
+        graph.add((observation, NS.county, NSR[county]))
+        graph.add(
+            (observation, NS.number_of_care_providers, Literal(index, datatype=XSD.integer))
+        )
+    # a second value of the same property is kept outside of the columns
+    graph.add((NSR["observation-0002"], NS.county, NSR.cz0201))
+
+
+def assert_same(store: Graph, memory: Graph) -> None:
+    assert len(store) == len(memory)
+    for pattern in PATTERNS:
+        assert set(store.triples(pattern)) == set(memory.triples(pattern))
+
+
+def test_store_matches_memory():
+    store, memory = create_graph(), Graph(store=Memory())
+    for graph in (store, memory):
+        add_cube(graph)
+    assert_same(store, memory)
+
+    changes = [
+        # only the type goes away, the other triples of the subject stay
+        (Graph.remove, (NSR["observation-0000"], RDF.type, QB.Observation)),
+        (Graph.remove, (NSR["observation-0001"], NS.county, None)),
+        (Graph.remove, (NSR["observation-0002"], NS.county, NSR.cz0100)),
+        (Graph.add, (NSR["observation-0000"], RDF.type, QB.Observation)),
+        (Graph.remove, (NSR["observation-0001"], None, None)),
+        (Graph.add, (NSR["observation-0001"], NS.county, NSR.cz0100)),
+        (Graph.add, (NSR["observation-0001"], RDF.type, QB.Observation)),
+        (Graph.remove, (None, NS.number_of_care_providers, None)),
+    ]
+    for change, triple in changes:
+        for graph in (store, memory):
+            change(graph, triple)
+        assert_same(store, memory)
@@ -1,24 +1,52 @@
 import datetime
-import os
 
 from rdflib import BNode, Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DCAT, DCTERMS, RDF, XSD, FOAF
 
+from cubes.distribution import read_metadata, write_graph
+from cubes.population import YEAR, period_label
+from cubes.snapshot import load_graph
+
 NS = Namespace("https://milan252525.github.io/ontology#")
 NSR = Namespace("https://milan252525.github.io/resources/")
 RDFS = Namespace("http://www.w3.org/2000/01/rdf-schema#")
 SPDX = Namespace("http://spdx.org/rdf/terms#")
 
+POPULATION = "out/population.ttl"
+
+FILE_TYPES = {
+    "ttl": "RDF_TURTLE",
+    "turtle": "RDF_TURTLE",
+    "nt": "RDF_N_TRIPLES",
+    "trig": "RDF_TRIG",
+    "xml": "RDF_XML",
+    "json-ld": "JSON_LD",
+    "csv": "CSV",
+}
+
 
-def generate_dataset(graph: Graph) -> Graph:
+def read_years(path: str) -> list[str]:
+    # the reference periods the population cube was actually built for
+    cube = load_graph(path)
+    return sorted(
+        str(period)[len(YEAR):]
+        for period in set(cube.objects(None, NS.ref_period))
+        if str(period).startswith(str(YEAR))
+    )
+
+
+def generate_dataset(graph: Graph, metadata: dict) -> Graph:
     cube = NSR.populationDataCubeInstance
+    years = read_years(POPULATION) or ["2021"]
+    period = period_label(years)
+    description = f"v roce {period}" if len(years) == 1 else f"v letech {period}"
 
     graph.add((cube, RDF.type, DCAT.Dataset))
-    graph.add((cube, DCTERMS.title, Literal("Population 2021", lang="en")))
+    graph.add((cube, DCTERMS.title, Literal(f"Population {period}", lang="en")))
     graph.add((cube, DCTERMS.title, Literal(
-        "Obyvatelé v okresech 2021", lang="cs")))
+        f"Obyvatelé v okresech {period}", lang="cs")))
     graph.add((cube, DCTERMS.description, Literal(
-        "Datová kostka obsahující obyvatele podle krajů a okresů v roce 2021", lang="cs")))
+        f"Datová kostka obsahující obyvatele podle krajů a okresů {description}", lang="cs")))
 
     graph.add((cube, DCAT.keyword, Literal("populace", lang="cs")))
     graph.add((cube, DCAT.keyword, Literal("okresy", lang="cs")))
@@ -32,58 +60,123 @@ def generate_dataset(graph: Graph) -> Graph:
     graph.add((cube, DCTERMS.spatial, URIRef(
         "http://publications.europa.eu/resource/authority/atu/CZE")))
 
-    year = BNode()
+    year = BNode("temporal")
     graph.add((cube, DCTERMS.temporal, year))
     graph.add((year, RDF.type, DCTERMS.PeriodOfTime))
     graph.add((year, DCAT.startDate, Literal(
-        datetime.date(2021, 1, 1), datatype=XSD.date)))
+        datetime.date(int(years[0]), 1, 1), datatype=XSD.date)))
     graph.add((year, DCAT.endDate, Literal(
-        datetime.date(2021, 12, 31), datatype=XSD.date)))
+        datetime.date(int(years[-1]), 12, 31), datatype=XSD.date)))
+
+    add_distribution(graph, cube, NSR.CubeDistribution, metadata)
+    add_publisher(graph, cube)
+
+    graph.add((cube, DCTERMS.accrualPeriodicity, URIRef(
+        "http://publications.europa.eu/resource/authority/frequency/IRREG")))
+
+    return graph
 
-    distribution = NSR.CubeDistribution
-    graph.add((cube, DCAT.distribution, distribution))
+
+def generate_care_providers_dataset(graph: Graph, metadata: dict) -> Graph:
+    cube = NSR.careProvidersDataCubeInstance
+
+    graph.add((cube, RDF.type, DCAT.Dataset))
+    graph.add((cube, DCTERMS.title, Literal("Care providers", lang="en")))
+    graph.add((cube, DCTERMS.title, Literal(
+        "Poskytovatelé zdravotních služeb", lang="cs")))
+    graph.add((cube, DCTERMS.description, Literal(
+        "Datová kostka obsahující počty poskytovatelů zdravotních služeb podle okresů, krajů a oborů péče", lang="cs")))
+
+    graph.add((cube, DCAT.keyword, Literal("poskytovatelé zdravotních služeb", lang="cs")))
+    graph.add((cube, DCAT.keyword, Literal("okresy", lang="cs")))
+    graph.add((cube, DCAT.keyword, Literal("kraje", lang="cs")))
+
+    graph.add((cube, DCTERMS.spatial, URIRef(
+        "http://publications.europa.eu/resource/authority/atu/CZE")))
+
+    add_distribution(graph, cube, NSR.careProvidersCubeDistribution, metadata)
+    add_publisher(graph, cube)
+
+    graph.add((cube, DCTERMS.accrualPeriodicity, URIRef(
+        "http://publications.europa.eu/resource/authority/frequency/IRREG")))
+
+    return graph
+
+
+def generate_hierarchy_dataset(graph: Graph, metadata: dict) -> Graph:
+    hierarchy = NSR.skosHierarchyDataset
+
+    graph.add((hierarchy, RDF.type, DCAT.Dataset))
+    graph.add((hierarchy, DCTERMS.title, Literal(
+        "Regions and counties hierarchy", lang="en")))
+    graph.add((hierarchy, DCTERMS.title, Literal("Hierarchie krajů a okresů", lang="cs")))
+    graph.add((hierarchy, DCTERMS.description, Literal(
+        "SKOS hierarchie krajů a okresů použitá v datových kostkách", lang="cs")))
+
+    graph.add((hierarchy, DCAT.keyword, Literal("okresy", lang="cs")))
+    graph.add((hierarchy, DCAT.keyword, Literal("kraje", lang="cs")))
+
+    graph.add((hierarchy, DCTERMS.spatial, URIRef(
+        "http://publications.europa.eu/resource/authority/atu/CZE")))
+
+    add_distribution(graph, hierarchy, NSR.skosHierarchyDistribution, metadata)
+    add_publisher(graph, hierarchy)
+
+    return graph
+
+
+def add_distribution(graph: Graph, dataset: URIRef, distribution: URIRef, metadata: dict) -> None:
+    graph.add((dataset, DCAT.distribution, distribution))
 
     graph.add((distribution, RDF.type, DCAT.Distribution))
     graph.add((distribution, DCAT.accessURL, URIRef(
         "https://milan252525.github.io/NDBI046")))
     graph.add((distribution, DCAT.downloadURL, URIRef(
-        "https://milan252525.github.io/NDBI046/files/population.ttl")))
+        "https://milan252525.github.io/NDBI046/files/" + metadata["file"])))
     graph.add((distribution, DCAT.mediaType, URIRef(
-        "http://www.iana.org/assignments/media-types/text/turtle")))
+        "http://www.iana.org/assignments/media-types/" + metadata["media_type"])))
     graph.add((distribution, DCTERMS.format, URIRef(
-        "http://publications.europa.eu/resource/authority/file-type/RDF_TURTLE")))
+        "http://publications.europa.eu/resource/authority/file-type/" + FILE_TYPES[metadata["format"]])))
+    graph.add((distribution, DCAT.byteSize, Literal(
+        metadata["byte_size"], datatype=XSD.nonNegativeInteger)))
 
-    # checksum
-    checksum = BNode()
+    # checksum computed while the file was written
+    checksum = BNode(distribution.split("/")[-1] + "-checksum")
     graph.add((distribution, SPDX.checksum, checksum))
     graph.add((checksum, RDF.type, SPDX.Checksum))
     graph.add((checksum, SPDX.algorithm, SPDX.checksumAlgorithm_sha256))
     graph.add((checksum, SPDX.checksumValue, Literal(
-        "c9f66ebb61a01ec09a3573e64d81c69e16a864a6edddf788c7e8a006343537d8", datatype=XSD.hexBinary)))
+        metadata["sha256"], datatype=XSD.hexBinary)))
+
 
-    publisher = BNode()
-    graph.add((cube, DCTERMS.publisher, publisher))
-    graph.add((cube, DCTERMS.creator, publisher))
+def add_publisher(graph: Graph, dataset: URIRef) -> None:
+    publisher = BNode("publisher")
+    graph.add((dataset, DCTERMS.publisher, publisher))
+    graph.add((dataset, DCTERMS.creator, publisher))
     graph.add((publisher, RDF.type, FOAF.Person))
     graph.add((publisher, FOAF.firstName, Literal("Milan")))
     graph.add((publisher, FOAF.lastName, Literal("Abrahám")))
 
-    graph.add((cube, DCTERMS.accrualPeriodicity, URIRef(
-        "http://publications.europa.eu/resource/authority/frequency/IRREG")))
 
-    return graph
+OUTPUTS = [
+    (POPULATION, generate_dataset),
+    ("out/care_providers.ttl", generate_care_providers_dataset),
+    ("out/skos_hierarchy.ttl", generate_hierarchy_dataset),
+]
 
 
 def main() -> None:
     graph = Graph()
 
-    graph = generate_dataset(graph)
+    for path, generate in OUTPUTS:
+        metadata = read_metadata(path)
+        if metadata is None:
+            print(f"Skipping {path}, generate it first")
+            continue
+        graph = generate(graph, metadata)
 
-    if not os.path.exists("out"):
-        os.makedirs("out")
-    with open("out/dcat_dataset.ttl", "wb") as file:
-        graph.serialize(file, "ttl")
-        print(f"Generated DCAT dataset into {file.name}")
+    write_graph(graph, "out/dcat_dataset.ttl")
+    print("Generated DCAT dataset into out/dcat_dataset.ttl")
 
 
 if __name__ == "__main__":
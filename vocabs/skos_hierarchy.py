@@ -1,20 +1,14 @@
-import os
-
-import pandas as pd
 from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import RDF, SKOS
 
+from cubes.codelist import CountyIndex, load_index
+from cubes.distribution import write_graph
+
 NS = Namespace("https://milan252525.github.io/ontology#")
 NSR = Namespace("https://milan252525.github.io/resources/")
 RDFS = Namespace("http://www.w3.org/2000/01/rdf-schema#")
 
 
-def clean_care_providers(care_providers: pd.DataFrame) -> pd.DataFrame:
-    columns = ["Okres", "OkresCode", "Kraj", "KrajCode", "OborPece"]
-    care_providers = care_providers[columns].dropna()
-    return care_providers
-
-
 def create_hierarchy(graph: Graph) -> Graph:
     region = NS.region
     county = NS.county
@@ -43,53 +37,42 @@ def create_hierarchy(graph: Graph) -> Graph:
     return graph
 
 
-def add_resources(data: pd.DataFrame, graph: Graph) -> Graph:
+def add_resources(codelist: CountyIndex, graph: Graph) -> Graph:
     region = NS.region
     county = NS.county
 
-    for _, row in (
-        data[["Okres", "OkresCode", "Kraj", "KrajCode"]]
-        .drop_duplicates()
-        .dropna()
-        .iterrows()
-    ):
-        graph.add((NSR[row["OkresCode"]], RDF.type, SKOS.Concept))
-        graph.add((NSR[row["OkresCode"]], SKOS.prefLabel,
-                  Literal(str(row["Okres"]), lang="cs")))
-        graph.add((NSR[row["OkresCode"]], SKOS.notation,
-                  Literal(str(row["OkresCode"]))))
-        graph.add((region, SKOS.hasTopConcept, NSR[row["OkresCode"]]))
-        graph.add((NSR[row["OkresCode"]], SKOS.inScheme, region))
-
-        graph.add((NSR[row["KrajCode"]], RDF.type, SKOS.Concept))
-        graph.add((NSR[row["KrajCode"]], SKOS.prefLabel,
-                  Literal(str(row["Kraj"]), lang="cs")))
-        graph.add((NSR[row["KrajCode"]], SKOS.notation,
-                  Literal(str(row["KrajCode"]))))
-        graph.add((county, SKOS.hasTopConcept, NSR[row["KrajCode"]]))
-        graph.add((NSR[row["KrajCode"]], SKOS.inScheme, county))
-
-        graph.add((NSR[row["KrajCode"]], SKOS.narrower, NSR[row["OkresCode"]]))
-        graph.add((NSR[row["OkresCode"]], SKOS.broader, NSR[row["KrajCode"]]))
+    for county_code, county_info in codelist.counties.items():
+        region_code = county_info["region"]
+
+        graph.add((NSR[county_code], RDF.type, SKOS.Concept))
+        graph.add((NSR[county_code], SKOS.prefLabel,
+                  Literal(county_info["label"], lang="cs")))
+        graph.add((NSR[county_code], SKOS.notation, Literal(county_code)))
+        graph.add((region, SKOS.hasTopConcept, NSR[county_code]))
+        graph.add((NSR[county_code], SKOS.inScheme, region))
+
+        graph.add((NSR[region_code], RDF.type, SKOS.Concept))
+        graph.add((NSR[region_code], SKOS.prefLabel,
+                  Literal(codelist.region_label(region_code), lang="cs")))
+        graph.add((NSR[region_code], SKOS.notation, Literal(region_code)))
+        graph.add((county, SKOS.hasTopConcept, NSR[region_code]))
+        graph.add((NSR[region_code], SKOS.inScheme, county))
+
+        graph.add((NSR[region_code], SKOS.narrower, NSR[county_code]))
+        graph.add((NSR[county_code], SKOS.broader, NSR[region_code]))
 
     return graph
 
 
 def main() -> None:
-    CP_URL = "https://opendata.mzcr.cz/data/nrpzs/narodni-registr-poskytovatelu-zdravotnich-sluzeb.csv"
-
-    care_providers = pd.read_csv(CP_URL, low_memory=False)
-    care_providers = clean_care_providers(care_providers)
+    codelist = load_index()
 
     graph = Graph()
     graph = create_hierarchy(graph)
-    graph = add_resources(care_providers, graph)
+    graph = add_resources(codelist, graph)
 
-    if not os.path.exists("out"):
-        os.makedirs("out")
-    with open("out/skos_hierarchy.ttl", "wb") as file:
-        graph.serialize(file, "ttl")
-        print(f"Generated SKOS hierarchy into {file.name}")
+    write_graph(graph, "out/skos_hierarchy.ttl")
+    print("Generated SKOS hierarchy into out/skos_hierarchy.ttl")
 
 
 if __name__ == "__main__":